@@ -1,11 +1,21 @@
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, flash, current_app
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, session, flash, current_app, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import os
-import PyPDF2
 import io
+import hashlib
+import tempfile
+import base64
+import json
+import csv
+import zlib
+from urllib.parse import urlencode
 from datetime import datetime
 import logging
-from database import DatabaseManager
+from database import DatabaseManager, UPLOAD_FOLDER
+from pdf_extractor import extract_pdf_pages
+from scrape_diff import summarize_scrape, content_hash, section_items
+from query_tracker import tracker
+import sql_profiler
 
 logger = logging.getLogger(__name__)
 
@@ -14,12 +24,95 @@ db = DatabaseManager()
 
 # PDF upload configuration
 ALLOWED_EXTENSIONS = {'pdf'}
-UPLOAD_FOLDER = 'uploads'
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
 
+# Page size cap for list APIs
+MAX_PAGE_SIZE = 500
+
+# Columns of a chat-history export, in order
+EXPORT_FIELDS = ['id', 'timestamp', 'session_id', 'user_id', 'user_message', 'bot_response']
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def store_pdf_file(file):
+    """Store an uploaded file under its SHA-256 content hash.
+
+    Returns (filename, content_hash, file_size). Identical content maps to
+    the same file, so a duplicate upload does not take extra disk space.
+    """
+    if not os.path.exists(UPLOAD_FOLDER):
+        os.makedirs(UPLOAD_FOLDER)
+    
+    sha256 = hashlib.sha256()
+    file_size = 0
+    fd, temp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            for chunk in iter(lambda: file.stream.read(64 * 1024), b''):
+                sha256.update(chunk)
+                temp_file.write(chunk)
+                file_size += len(chunk)
+        
+        content_hash = sha256.hexdigest()
+        filename = f"{content_hash}.pdf"
+        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        if not os.path.exists(filepath):
+            os.replace(temp_path, filepath)
+        return filename, content_hash, file_size
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def extract_pdf_content(pdf_id, filepath):
+    """Extract and save the pages of an upload in a time/memory limited worker, recording the outcome"""
+    extraction = extract_pdf_pages(filepath)
+    
+    for page_num, content in extraction['pages']:
+        # Extract keywords (simple approach)
+        keywords = ' '.join([word.lower() for word in content.split() if len(word) > 3])
+        
+        db.save_pdf_content(pdf_id, page_num, content, keywords)
+    
+    if extraction['error']:
+        status = extraction['error']
+    elif extraction['failed_pages']:
+        status = 'partial'
+    else:
+        status = 'complete'
+    db.update_pdf_extraction_status(pdf_id, status, extraction['failed_pages'])
+
+def encode_cursor(key):
+    """Encode a (timestamp, id) keyset position as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor, raising ValueError if malformed"""
+    if not cursor:
+        return None
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(timestamp), int(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def page_args(default_limit):
+    """Read limit, cursor and date range (from/to) query parameters"""
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), MAX_PAGE_SIZE))
+    after = decode_cursor(request.args.get('cursor'))
+    return limit, after, request.args.get('from'), request.args.get('to')
+
+def paginated_response(items, next_key):
+    """JSON list response with the next page cursor in X-Next-Cursor and Link headers"""
+    response = jsonify(items)
+    if next_key:
+        cursor = encode_cursor(next_key)
+        args = request.args.to_dict()
+        args['cursor'] = cursor
+        response.headers['X-Next-Cursor'] = cursor
+        response.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+    return response
+
 @admin_bp.route('/')
 def index():
     """Redirect to login if not authenticated"""
@@ -71,12 +164,8 @@ def dashboard():
     if 'admin_id' not in session:
         return redirect(url_for('admin.login'))
     
-    stats = {
-        'total_users': len(db.get_all_users()),
-        'total_chats': len(db.get_chat_history()),
-        'total_pdfs': len(db.get_pdf_uploads()),
-        'recent_logs': db.get_admin_logs(limit=10)
-    }
+    stats = db.get_stats()
+    stats['recent_logs'] = db.get_admin_logs(limit=10)
     
     return render_template('dashboard.html', stats=stats)
 
@@ -100,44 +189,58 @@ def upload_pdf():
                 return jsonify({'error': 'No file selected'}), 400
             
             if file and allowed_file(file.filename):
-                # Create uploads directory if not exists
-                if not os.path.exists(UPLOAD_FOLDER):
-                    os.makedirs(UPLOAD_FOLDER)
-                
-                # Save file
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
+                # Save file by content hash
+                filename, content_hash, file_size = store_pdf_file(file)
                 filepath = os.path.join(UPLOAD_FOLDER, filename)
-                file.save(filepath)
                 
-                # Get file size
-                file_size = os.path.getsize(filepath)
+                pdf_id = None
+                existing = db.get_pdf_by_hash(content_hash)
+                if not existing:
+                    # Save to database
+                    pdf_id = db.save_pdf_upload(
+                        filename, file.filename, category, tags, description, 
+                        file_size, session['admin_id'], content_hash
+                    )
+                    if not pdf_id:
+                        # A concurrent upload of the same file may have saved it first
+                        existing = db.get_pdf_by_hash(content_hash)
                 
-                # Save to database
-                pdf_id = db.save_pdf_upload(
-                    filename, file.filename, category, tags, description, 
-                    file_size, session['admin_id']
-                )
+                # Same file already uploaded: reuse its extracted content, only refresh metadata
+                if existing:
+                    db.update_pdf_metadata(existing[0], category, tags, description)
+                    
+                    # Unless its extraction failed or was cut short: retry it with this upload
+                    reextracted = existing[11] != 'complete'  # extraction_status
+                    if reextracted:
+                        try:
+                            db.clear_pdf_content(existing[0])
+                            extract_pdf_content(existing[0], filepath)
+                        except Exception as e:
+                            logger.error(f"Error extracting PDF content: {e}")
+                    
+                    db.clear_learned_query_mappings()
+                    tracker.prewarm_async()
+                    db.log_admin_action(session['admin_id'], 'upload_pdf', f'Re-uploaded existing PDF: {file.filename}')
+                    
+                    return jsonify({
+                        'success': True,
+                        'message': 'PDF already uploaded, content re-extracted' if reextracted
+                                   else 'PDF already uploaded, details updated',
+                        'pdf_id': existing[0],
+                        'duplicate': True,
+                        'reextracted': reextracted
+                    })
                 
                 if pdf_id:
-                    # Extract and save PDF content
                     try:
-                        with open(filepath, 'rb') as pdf_file:
-                            pdf_reader = PyPDF2.PdfReader(pdf_file)
-                            
-                            for page_num in range(len(pdf_reader.pages)):
-                                page = pdf_reader.pages[page_num]
-                                content = page.extract_text()
-                                
-                                # Extract keywords (simple approach)
-                                keywords = ' '.join([word.lower() for word in content.split() if len(word) > 3])
-                                
-                                db.save_pdf_content(pdf_id, page_num + 1, content, keywords)
-                    
+                        extract_pdf_content(pdf_id, filepath)
                     except Exception as e:
                         logger.error(f"Error extracting PDF content: {e}")
                     
+                    # New content can change which PDFs answer a query
+                    db.clear_learned_query_mappings()
+                    tracker.prewarm_async()
+                    
                     # Log action
                     db.log_admin_action(session['admin_id'], 'upload_pdf', f'Uploaded PDF: {file.filename}')
                     
@@ -147,8 +250,7 @@ def upload_pdf():
                         'pdf_id': pdf_id
                     })
                 else:
-                    # Remove file if database save failed
-                    os.remove(filepath)
+                    # The stored file is content-addressed and may back another upload, so it is kept
                     return jsonify({'error': 'Failed to save PDF information'}), 500
             else:
                 return jsonify({'error': 'Invalid file type. Only PDF files are allowed'}), 400
@@ -178,8 +280,7 @@ def delete_pdf(pdf_id):
     
     try:
         # Get PDF info for logging
-        pdfs = db.get_pdf_uploads()
-        pdf_info = next((pdf for pdf in pdfs if pdf[0] == pdf_id), None)
+        pdf_info = db.get_pdf_by_id(pdf_id)
         
         if pdf_info:
             # Delete from database
@@ -202,6 +303,50 @@ def delete_pdf(pdf_id):
         logger.error(f"Error deleting PDF: {e}")
         return jsonify({'error': 'Failed to delete PDF'}), 500
 
+@admin_bp.route('/api/pdfs/batch', methods=['POST'])
+def api_batch_pdfs():
+    """Delete, archive or restore several PDFs at once"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+        pdf_ids = [int(pdf_id) for pdf_id in data.get('ids', [])]
+        
+        if action not in ('delete', 'archive', 'restore'):
+            return jsonify({'error': 'Action must be delete, archive or restore'}), 400
+        if not pdf_ids:
+            return jsonify({'error': 'No PDF IDs provided'}), 400
+        
+        pdfs = db.get_pdfs_by_ids(pdf_ids)
+        found_ids = [pdf[0] for pdf in pdfs]
+        
+        if action == 'delete':
+            count = db.delete_pdfs(found_ids)
+            for pdf in pdfs:
+                filepath = os.path.join(UPLOAD_FOLDER, pdf[1])
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+        else:
+            count = db.set_pdfs_status(found_ids, 'archived' if action == 'archive' else 'active')
+        
+        # Archived PDFs must stop answering cached queries
+        db.clear_learned_query_mappings()
+        tracker.prewarm_async()
+        db.log_admin_action(session['admin_id'], f'{action}_pdfs', f'{action.title()} PDFs: {found_ids}')
+        
+        return jsonify({
+            'success': True,
+            'count': count,
+            'not_found': [pdf_id for pdf_id in pdf_ids if pdf_id not in found_ids]
+        })
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid PDF IDs'}), 400
+    except Exception as e:
+        logger.error(f"Error in batch PDF action: {e}")
+        return jsonify({'error': 'Batch PDF action failed'}), 500
+
 @admin_bp.route('/api/search-pdfs')
 def search_pdfs():
     """Search PDFs API"""
@@ -219,6 +364,112 @@ def search_pdfs():
         logger.error(f"Error searching PDFs: {e}")
         return jsonify({'error': 'Search failed'}), 500
 
+@admin_bp.route('/api/query-mappings', methods=['GET', 'POST'])
+def api_query_mappings():
+    """List cached query-PDF mappings or pin a query to a PDF"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if request.method == 'POST':
+        try:
+            data = request.get_json()
+            query = data.get('query', '')
+            pdf_id = data.get('pdf_id')
+            score = data.get('relevance_score', 1.0)
+            
+            if not query or not pdf_id:
+                return jsonify({'error': 'Query and pdf_id are required'}), 400
+            
+            if db.save_query_pdf_mapping(query, pdf_id, score, pinned=True):
+                db.log_admin_action(session['admin_id'], 'pin_query', f'Pinned "{query}" to PDF ID: {pdf_id}')
+                return jsonify({'success': True})
+            return jsonify({'error': 'Failed to pin query'}), 500
+        except Exception as e:
+            logger.error(f"Error pinning query mapping: {e}")
+            return jsonify({'error': 'Failed to pin query'}), 500
+    
+    try:
+        pinned_only = request.args.get('pinned') == '1'
+        limit = request.args.get('limit', 100, type=int)
+        return jsonify(db.get_query_pdf_mappings(pinned_only=pinned_only, limit=limit))
+    except Exception as e:
+        logger.error(f"Error getting query mappings: {e}")
+        return jsonify({'error': 'Failed to get query mappings'}), 500
+
+@admin_bp.route('/api/query-mappings/<int:mapping_id>', methods=['DELETE'])
+def api_delete_query_mapping(mapping_id):
+    """Remove a cached or pinned query-PDF mapping"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if db.delete_query_pdf_mapping(mapping_id):
+        db.log_admin_action(session['admin_id'], 'unpin_query', f'Deleted query mapping ID: {mapping_id}')
+        return jsonify({'success': True})
+    return jsonify({'error': 'Failed to delete query mapping'}), 500
+
+@admin_bp.route('/api/top-queries')
+def api_top_queries():
+    """Most frequent user queries, counted across all worker processes"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        limit = min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE)
+        return jsonify({
+            'queries': tracker.top(limit),
+            'total_recorded': tracker.total(),
+            'capacity': tracker.capacity
+        })
+    except Exception as e:
+        logger.error(f"Error getting top queries: {e}")
+        return jsonify({'error': 'Failed to get top queries'}), 500
+
+@admin_bp.route('/api/top-queries/prewarm', methods=['POST'])
+def api_prewarm_top_queries():
+    """Answer the top queries once to warm the chat caches"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        warmed = tracker.prewarm(min(int(data.get('limit', 20)), MAX_PAGE_SIZE))
+        db.log_admin_action(session['admin_id'], 'prewarm_queries', f'Pre-warmed {warmed} top queries')
+        return jsonify({'success': True, 'warmed': warmed})
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid limit'}), 400
+    except Exception as e:
+        logger.error(f"Error pre-warming top queries: {e}")
+        return jsonify({'error': 'Pre-warm failed'}), 500
+
+@admin_bp.route('/api/sql-profile', methods=['GET', 'POST'])
+def api_sql_profile():
+    """Top SQL statements by total time and recent slow queries of this worker; POST toggles or resets profiling here"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if 'enabled' in data:
+            sql_profiler.set_enabled(data['enabled'])
+        if data.get('reset'):
+            sql_profiler.reset()
+        db.log_admin_action(session['admin_id'], 'sql_profile',
+                            f"SQL profiling {'enabled' if sql_profiler.is_enabled() else 'disabled'}"
+                            + (', statistics reset' if data.get('reset') else ''))
+    
+    try:
+        limit = min(request.args.get('limit', 20, type=int), MAX_PAGE_SIZE)
+        return jsonify({
+            'enabled': sql_profiler.is_enabled(),
+            'worker': os.getpid(),
+            'slow_query_ms': sql_profiler.SLOW_QUERY_MS,
+            'statements': sql_profiler.top_statements(limit, request.args.get('order_by', 'total_ms')),
+            'slow_queries': sql_profiler.slow_queries(limit)
+        })
+    except Exception as e:
+        logger.error(f"Error getting SQL profile: {e}")
+        return jsonify({'error': 'Failed to get SQL profile'}), 500
+
 @admin_bp.route('/api/scraping-status')
 def api_scraping_status():
     """Get scraping status"""
@@ -253,22 +504,70 @@ def api_scrape_all():
     try:
         from scraper import VBSPUScraper
         scraper = VBSPUScraper()
+        previous = db.get_scraped_data()
         data = scraper.scrape_all()
         
         # Save to database
         for category, content in data.items():
             db.save_scraped_data(category, content)
         
+        tracker.prewarm_async()
         db.log_admin_action(session['admin_id'], 'scrape_all', 'Full scraping triggered')
         return jsonify({
             'status': 'success',
             'message': 'Scraping completed successfully',
-            'data': data
+            'scraped_at': data.get('scraped_at'),
+            'summary': summarize_scrape(previous, data)
         })
     except Exception as e:
         logger.error(f"Error in full scraping: {e}")
         return jsonify({'error': 'Scraping failed'}), 500
 
+@admin_bp.route('/api/scraped-data/<category>')
+def api_scraped_data(category):
+    """Fetch stored scraped data for a category, one section page at a time
+
+    Without a section, returns the scalar fields plus each section's size and
+    the content hash; with ?section=..., returns offset/limit items of it.
+    """
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        data = db.get_scraped_data(category)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Category not found'}), 404
+        
+        section = request.args.get('section')
+        if not section:
+            return jsonify({
+                'category': category,
+                'content_hash': content_hash(data),
+                'fields': {k: v for k, v in data.items() if not isinstance(v, (list, dict))},
+                'sections': {name: len(items) for name, items in section_items(data).items()}
+            })
+        
+        if section not in data or not isinstance(data[section], (list, dict)):
+            return jsonify({'error': 'Section not found'}), 404
+        
+        items = data[section]
+        if isinstance(items, dict):
+            items = [{'key': key, 'value': value} for key, value in items.items()]
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+        
+        return jsonify({
+            'category': category,
+            'section': section,
+            'total': len(items),
+            'offset': offset,
+            'items': items[offset:offset + limit],
+            'next_offset': offset + limit if offset + limit < len(items) else None
+        })
+    except Exception as e:
+        logger.error(f"Error getting scraped data: {e}")
+        return jsonify({'error': 'Failed to get scraped data'}), 500
+
 @admin_bp.route('/api/add-user', methods=['POST'])
 def api_add_user():
     """Add new user"""
@@ -410,23 +709,15 @@ def api_dashboard():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        # Get statistics
-        users = db.get_all_users()
-        chats = db.get_chat_history()
-        pdfs = db.get_pdf_uploads()
+        # Get statistics from cached counters
+        counts = db.get_stats()
         logs = db.get_admin_logs(limit=10)
         
-        # Get last scraping data
-        scraped_data = db.get_scraped_data()
-        last_updated = None
-        if scraped_data:
-            last_updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
         stats = {
-            'total_users': len(users),
-            'total_chats': len(chats),
-            'total_pdfs': len(pdfs),
-            'data_last_updated': last_updated or 'Never',
+            'total_users': counts['total_users'],
+            'total_chats': counts['total_chats'],
+            'total_pdfs': counts['total_pdfs'],
+            'data_last_updated': counts['data_last_updated'] or 'Never',
             'bot_status': 'Active',
             'recent_logs': logs
         }
@@ -435,6 +726,35 @@ def api_dashboard():
         logger.error(f"Error getting dashboard stats: {e}")
         return jsonify({'error': 'Failed to get stats'}), 500
 
+@admin_bp.route('/api/analytics')
+def api_analytics():
+    """Get chat analytics from the pre-aggregated rollups"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        days = min(request.args.get('days', 7, type=int), 366)
+        hours = min(request.args.get('hours', 48, type=int), 24 * 31)
+        return jsonify(db.get_chat_analytics(days=max(days, 1), hours=max(hours, 1)))
+    except Exception as e:
+        logger.error(f"Error getting analytics: {e}")
+        return jsonify({'error': 'Failed to get analytics'}), 500
+
+@admin_bp.route('/api/chat-maintenance', methods=['POST'])
+def api_chat_maintenance():
+    """Archive old chat months, apply retention, compact rollups and finish interrupted PDF deletes"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        result = db.run_chat_maintenance()
+        db.log_admin_action(session['admin_id'], 'chat_maintenance',
+                            f"Archived {result['archived_rows']} chats, dropped {result['dropped_months']} months")
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        logger.error(f"Error running chat maintenance: {e}")
+        return jsonify({'error': 'Chat maintenance failed'}), 500
+
 @admin_bp.route('/api/scrape', methods=['POST'])
 def api_scrape():
     """Manual scraping trigger"""
@@ -444,14 +764,16 @@ def api_scrape():
     try:
         from scraper import VBSPUScraper
         scraper = VBSPUScraper()
+        previous = db.get_scraped_data()
         data = scraper.scrape_all()
         
         # Save to database
         for category, content in data.items():
             db.save_scraped_data(category, content)
         
+        tracker.prewarm_async()
         db.log_admin_action(session['admin_id'], 'scrape', 'Manual scraping triggered')
-        return jsonify({'success': True, 'data': data})
+        return jsonify({'success': True, 'summary': summarize_scrape(previous, data)})
     except Exception as e:
         logger.error(f"Error scraping: {e}")
         return jsonify({'error': 'Scraping failed'}), 500
@@ -483,41 +805,121 @@ def api_settings():
 
 @admin_bp.route('/api/users')
 def api_users():
-    """Get users list"""
+    """Get users list (keyset paginated via cursor)"""
     if 'admin_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        users = db.get_all_users()
-        return jsonify(users)
+        limit, after, start, end = page_args(100)
+        users, next_key = db.get_users_page(limit=limit, after=after, start=start, end=end)
+        return paginated_response(users, next_key)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting users: {e}")
         return jsonify({'error': 'Failed to get users'}), 500
 
 @admin_bp.route('/api/logs')
 def api_logs():
-    """Get admin logs"""
+    """Get admin logs (keyset paginated, filter by user_id and from/to)"""
     if 'admin_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        limit = request.args.get('limit', 50, type=int)
-        logs = db.get_admin_logs(limit=limit)
-        return jsonify(logs)
+        limit, after, start, end = page_args(50)
+        admin_id = request.args.get('user_id', type=int)
+        logs, next_key = db.get_admin_logs_page(limit=limit, after=after, admin_id=admin_id, start=start, end=end)
+        return paginated_response(logs, next_key)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting logs: {e}")
         return jsonify({'error': 'Failed to get logs'}), 500
 
 @admin_bp.route('/api/chat-history')
 def api_chat_history():
-    """Get chat history"""
+    """Get chat history (keyset paginated, filter by session_id, user_id, from/to; archived=1 adds archives)"""
     if 'admin_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        limit = request.args.get('limit', 100, type=int)
-        history = db.get_chat_history(limit=limit)
-        return jsonify(history)
+        limit, after, start, end = page_args(100)
+        history, next_key = db.get_chat_history_page(
+            limit=limit, after=after,
+            session_id=request.args.get('session_id'),
+            user_id=request.args.get('user_id', type=int),
+            start=start, end=end,
+            include_archive=request.args.get('archived') == '1'
+        )
+        return paginated_response(history, next_key)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting chat history: {e}")
         return jsonify({'error': 'Failed to get chat history'}), 500
+
+@admin_bp.route('/api/chat-history/export')
+def api_export_chat_history():
+    """Stream chat history as NDJSON or CSV (optionally gzipped)"""
+    if 'admin_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Format must be ndjson or csv'}), 400
+    use_gzip = request.args.get('gzip') in ('1', 'true')
+    
+    rows = db.iter_chat_history(
+        session_id=request.args.get('session_id'),
+        user_id=request.args.get('user_id', type=int),
+        start=request.args.get('from'),
+        end=request.args.get('to'),
+        include_archive=request.args.get('archived') == '1'
+    )
+    
+    def generate_lines():
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                if buffer.tell() > 64 * 1024:
+                    yield buffer.getvalue().encode('utf-8')
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue().encode('utf-8')
+        else:
+            chunk = []
+            for row in rows:
+                chunk.append(json.dumps(row, ensure_ascii=False))
+                if len(chunk) >= 500:
+                    yield ('\n'.join(chunk) + '\n').encode('utf-8')
+                    chunk = []
+            if chunk:
+                yield ('\n'.join(chunk) + '\n').encode('utf-8')
+    
+    def generate():
+        if not use_gzip:
+            yield from generate_lines()
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+        for data in generate_lines():
+            compressed = compressor.compress(data)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+    
+    db.log_admin_action(session['admin_id'], 'export_chat_history', f'Exported chat history as {export_format}')
+    
+    filename = f"chat_history_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    if use_gzip:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
@@ -0,0 +1,162 @@
+"""Scraper benchmarks against the local mock VBSPU site.
+
+Times VBSPUScraper.scrape_all and each scrape_* method end to end, and
+parse_fee_pdf_data on its own, against benchmarks/mock_site.py. For every
+benchmark it reports wall time, CPU time (the benchmark thread plus the PDF
+extraction workers), and the requests made and bytes transferred per run.
+
+    python -m benchmarks.bench_scraper
+    python -m benchmarks.bench_scraper --repeat 10 --only scrape_fees,parse_fee_pdf_data
+    python -m benchmarks.bench_scraper --latency 0.2 --error-rate 0.1 --slow-body 65536 --json
+
+scrape_all saves into a throwaway database, and the benchmarks run in a
+temporary working directory, so importing database.py (which opens
+vbspu_bot.db in the working directory) never touches the live database.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.mock_site import MockVBSPUSite
+
+# Each scrape_* phase in scrape_all order, then the full run and the PDF parser
+SCRAPE_METHODS = ['scrape_admissions', 'scrape_courses', 'scrape_exams', 'scrape_fees', 'scrape_news_notices']
+BENCHMARKS = SCRAPE_METHODS + ['scrape_all', 'parse_fee_pdf_data']
+
+# The parser takes microseconds per call, so each of its runs parses every fee PDF this many times
+PARSE_ITERATIONS = 200
+
+def _cpu_seconds():
+    """CPU time of this thread plus that of finished child processes (PDF extraction workers)"""
+    children = os.times()
+    return time.thread_time() + children.children_user + children.children_system
+
+def fee_pdf_texts(scraper, site):
+    """Text of every fee PDF the mock site serves, extracted the way scrape_fees does"""
+    paths = [path for path, (_, content_type) in site.documents.items() if content_type == 'application/pdf']
+    return [scraper.extract_pdf_text(site.base_url + path) for path in sorted(paths)]
+
+def make_benchmark(name, scraper, site, db_name):
+    """Callable doing one run of the named benchmark"""
+    if name == 'scrape_all':
+        scraper.db_name = db_name
+        return scraper.scrape_all
+    if name == 'parse_fee_pdf_data':
+        texts = fee_pdf_texts(scraper, site)
+
+        def parse_fee_pdfs():
+            for _ in range(PARSE_ITERATIONS):
+                for text in texts:
+                    scraper.parse_fee_pdf_data(text)
+        return parse_fee_pdfs
+    return getattr(scraper, name)
+
+def measure(benchmark, site, repeat, warmup):
+    """Run a benchmark repeatedly and summarize time, CPU, requests and bytes per run"""
+    for _ in range(warmup):
+        benchmark()
+
+    wall, cpu = [], []
+    site.reset_stats()
+    for _ in range(repeat):
+        cpu_started = _cpu_seconds()
+        started = time.perf_counter()
+        benchmark()
+        wall.append((time.perf_counter() - started) * 1000)
+        cpu.append((_cpu_seconds() - cpu_started) * 1000)
+    stats = site.stats()
+
+    return {
+        'runs': repeat,
+        'wall_ms': round(statistics.median(wall), 2),
+        'wall_min_ms': round(min(wall), 2),
+        'wall_max_ms': round(max(wall), 2),
+        'cpu_ms': round(statistics.median(cpu), 2),
+        'requests': round(stats['requests'] / repeat, 2),
+        'bytes': round(stats['bytes'] / repeat),
+        'errors': sum(count for status, count in stats['statuses'].items() if status >= 400)
+    }
+
+def run(names, repeat=5, warmup=1, latency=0.0, error_rate=0.0, slow_body_bps=None, seed=0):
+    """Benchmark each named target against a fresh mock site. Returns the report dict"""
+    from scraper import VBSPUScraper
+
+    results = {}
+    cwd = os.getcwd()
+    with MockVBSPUSite(seed=seed) as site, tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for name in names:
+                # Fixtures are fetched fault-free; the faults apply to the measured runs
+                site.configure()
+                scraper = VBSPUScraper(base_url=site.base_url)
+                benchmark = make_benchmark(name, scraper, site, os.path.join(tmp, 'bench.db'))
+                site.configure(latency=latency, error_rate=error_rate, slow_body_bps=slow_body_bps)
+                results[name] = measure(benchmark, site, repeat, warmup)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        'benchmarks': results,
+        'config': {
+            'repeat': repeat,
+            'warmup': warmup,
+            'latency': latency,
+            'error_rate': error_rate,
+            'slow_body_bps': slow_body_bps,
+            'parse_iterations': PARSE_ITERATIONS,
+            'seed': seed,
+            'recorded_at': datetime.now().isoformat(timespec='seconds')
+        }
+    }
+
+def print_report(report):
+    header = (f"{'benchmark':<22}{'wall ms':>10}{'min ms':>10}{'max ms':>10}{'cpu ms':>10}"
+              f"{'requests':>10}{'bytes':>10}{'errors':>8}")
+    print(header)
+    print('-' * len(header))
+    for name, stats in report['benchmarks'].items():
+        print(f"{name:<22}{stats['wall_ms']:>10}{stats['wall_min_ms']:>10}{stats['wall_max_ms']:>10}"
+              f"{stats['cpu_ms']:>10}{stats['requests']:>10}{stats['bytes']:>10}{stats['errors']:>8}")
+    print(f"\nPer run, median of {report['config']['repeat']}; "
+          f"parse_fee_pdf_data parses each fee PDF {PARSE_ITERATIONS} times per run")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the VBSPU scraper against a local mock site')
+    parser.add_argument('--only', help=f"Comma-separated benchmarks (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--repeat', type=int, default=5, help='Measured runs per benchmark')
+    parser.add_argument('--warmup', type=int, default=1, help='Unmeasured runs first')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the mock site waits before each response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests the mock site answers 503')
+    parser.add_argument('--slow-body', type=int, metavar='BPS', help='Throttle response bodies to this many bytes/second')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--verbose', action='store_true', help='Show the scraper INFO logging')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(',')] if args.only else BENCHMARKS
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+    else:
+        # Errors from injected faults are expected
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+    report = run(names, args.repeat, args.warmup, args.latency, args.error_rate, args.slow_body, args.seed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
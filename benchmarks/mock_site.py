@@ -0,0 +1,223 @@
+"""Local stand-in for www.vbspu.ac.in serving recorded pages and fee PDFs.
+
+Serves the homepage, the online fee article and the fee structure PDFs it
+links to from benchmarks/fixtures, so VBSPUScraper can be benchmarked and
+regression-tested offline. Latency, server errors and slow (throttled)
+bodies can be injected, and every request and byte served is counted.
+
+    python -m benchmarks.mock_site --port 8800 --latency 0.2 --error-rate 0.1
+    VBSPU_BASE_URL=http://127.0.0.1:8800 python scraper.py
+"""
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Request path -> (fixture file, content type). PDFs are rendered from text fixtures.
+ROUTES = {
+    '/': ('homepage.html', 'text/html; charset=utf-8'),
+    '/en': ('homepage.html', 'text/html; charset=utf-8'),
+    '/en/article/online-fee20': ('fee_page.html', 'text/html; charset=utf-8'),
+    '/uploads/fee/UG_Fee_Structure_2025-26.pdf': ('fee_ug.txt', 'application/pdf'),
+    '/uploads/fee/PG_Fee_Structure_2025-26.pdf': ('fee_pg.txt', 'application/pdf'),
+}
+
+# Bytes written per chunk when a body is throttled
+SLOW_BODY_CHUNK = 1024
+
+# Text lines per rendered PDF page
+PDF_LINES_PER_PAGE = 50
+
+def _pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def text_to_pdf(text):
+    """Render plain text as a minimal PDF (Helvetica, one Tj per line)"""
+    lines = text.splitlines() or ['']
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)]
+
+    # 1: catalog, 2: page tree, 3: font, then a page and a content stream per page
+    objects = [None, None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    page_ids = []
+    for page_lines in pages:
+        stream = 'BT /F1 10 Tf 14 TL 50 800 Td\n'
+        stream += ''.join(f'({_pdf_escape(line)}) Tj T*\n' for line in page_lines) + 'ET'
+        stream = stream.encode('cp1252', errors='replace')
+        content_id = len(objects) + 2
+        page_ids.append(len(objects) + 1)
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>'.encode())
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(f"{i} 0 R" for i in page_ids)}] /Count {len(page_ids)} >>'.encode()
+
+    pdf = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+def load_fixtures(fixtures_dir=FIXTURES_DIR):
+    """Read every routed fixture into memory as (body bytes, content type)"""
+    documents = {}
+    for path, (filename, content_type) in ROUTES.items():
+        with open(os.path.join(fixtures_dir, filename), encoding='utf-8') as f:
+            text = f.read()
+        body = text_to_pdf(text) if content_type == 'application/pdf' else text.encode('utf-8')
+        documents[path] = (body, content_type)
+    return documents
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, keep-alive clients stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        site = self.server.site
+        path = self.path.split('?', 1)[0]
+        if len(path) > 1:
+            path = path.rstrip('/')
+
+        if site.latency:
+            time.sleep(site.latency)
+
+        document = site.documents.get(path)
+        if site.should_fail():
+            status, body, content_type = 503, b'Service Unavailable', 'text/plain'
+        elif document is None:
+            status, body, content_type = 404, b'Not Found', 'text/plain'
+        else:
+            status, (body, content_type) = 200, document
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        sent = 0
+        try:
+            if site.slow_body_bps and status == 200:
+                for start in range(0, len(body), SLOW_BODY_CHUNK):
+                    chunk = body[start:start + SLOW_BODY_CHUNK]
+                    self.wfile.write(chunk)
+                    self.wfile.flush()
+                    sent += len(chunk)
+                    time.sleep(len(chunk) / site.slow_body_bps)
+            else:
+                self.wfile.write(body)
+                sent = len(body)
+        finally:
+            site.record(path, status, sent)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+class MockVBSPUSite:
+    """Threaded HTTP server for the recorded VBSPU pages with injectable faults"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, slow_body_bps=None,
+                 seed=0, fixtures_dir=FIXTURES_DIR):
+        self.host = host
+        self.port = port
+        self.documents = load_fixtures(fixtures_dir)
+        self.random = random.Random(seed)
+        self.configure(latency=latency, error_rate=error_rate, slow_body_bps=slow_body_bps)
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.reset_stats()
+
+    def configure(self, latency=0.0, error_rate=0.0, slow_body_bps=None):
+        """Set the faults injected into subsequent responses"""
+        self.latency = latency            # seconds added before each response
+        self.error_rate = error_rate      # fraction of requests answered 503
+        self.slow_body_bps = slow_body_bps  # throttle bodies to this many bytes/second
+
+    def should_fail(self):
+        with self.lock:
+            return self.error_rate > 0 and self.random.random() < self.error_rate
+
+    def record(self, path, status, sent):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            self.paths[path] = self.paths.get(path, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def reset_stats(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.paths = {}
+            self.statuses = {}
+
+    def stats(self):
+        """Requests and body bytes served since the last reset"""
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'bytes': self.bytes_sent,
+                'paths': dict(self.paths),
+                'statuses': dict(self.statuses)
+            }
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Start serving in a background thread and return the base URL"""
+        self.server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self.server.daemon_threads = True
+        self.server.site = self
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name='mock-vbspu-site', daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded VBSPU pages locally')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added before each response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered 503')
+    parser.add_argument('--slow-body', type=int, metavar='BPS', help='Throttle bodies to this many bytes/second')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG)
+    site = MockVBSPUSite(args.host, args.port, args.latency, args.error_rate, args.slow_body, args.seed)
+    print(f"Serving recorded VBSPU site at {site.start()} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        site.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import logging
+from functools import lru_cache
+
+from metrics import CHAT_STAGE_SECONDS
+from database import PDF_RESPONSE_HEADER
+from response_templates import DEFAULT_OFF_TOPIC_RESPONSE, ILLEGAL_RESPONSE, current_templates, get_templates
+
+logger = logging.getLogger(__name__)
+
+# Order in which streamed response sections are shown and saved
+RESPONSE_SECTION_ORDER = ('answer', 'pdf', 'category')
+
+# Guards, checked before anything is looked up: (intent, keywords)
+GUARD_KEYWORDS = (
+    ('off_topic', ('weather', 'politics', 'sports', 'movies', 'entertainment', 'jokes')),
+    ('illegal', ('fake', 'forged', 'illegal', 'duplicate marksheet', 'fake certificate'))
+)
+
+# Topics, checked in order after the guards; anything else is 'general'.
+# Exam phrases come first: "admit card" would otherwise match 'admit'.
+INTENT_KEYWORDS = (
+    ('exam', ('admit card', 'hall ticket')),
+    ('admission', ('admission', 'admit', 'apply', 'entrance')),
+    ('course', ('course', 'department', 'program', 'study')),
+    ('exam', ('exam', 'result', 'date', 'schedule')),
+    ('fee', ('fee', 'fees', 'scholarship', 'cost')),
+    ('news', ('news', 'notice', 'announcement', 'update')),
+    ('contact', ('contact', 'phone', 'address', 'email')),
+    ('facility', ('hostel', 'library', 'facility', 'transport'))
+)
+
+# Normalized messages whose guard and intent results are remembered
+MAX_CACHED_INTENTS = 4096
+
+def normalize_message(user_message):
+    return user_message.strip().lower()
+
+@lru_cache(maxsize=MAX_CACHED_INTENTS)
+def check_guards(query):
+    """Guard intent ('off_topic' or 'illegal') a normalized message trips, else None"""
+    for intent, keywords in GUARD_KEYWORDS:
+        if any(keyword in query for keyword in keywords):
+            return intent
+    return None
+
+@lru_cache(maxsize=MAX_CACHED_INTENTS)
+def classify(query):
+    """Intent of a normalized message: a guard, a topic or 'general'"""
+    guard = check_guards(query)
+    if guard:
+        return guard
+    for intent, keywords in INTENT_KEYWORDS:
+        if any(keyword in query for keyword in keywords):
+            return intent
+    return 'general'
+
+class ChatPipeline:
+    """Answers chat messages in stages: normalize, guards, intent, templates, render, PDF search, persist.
+
+    Each stage can end the answer early. Guarded messages are answered
+    without any database access, fixed answers without the category block
+    or PDF search. Intents are cached per normalized message, templates
+    per data and settings version, and rendered category blocks per
+    template version (see response_templates).
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def detect_intent(self, user_message):
+        return classify(normalize_message(user_message))
+
+    def guard_answer(self, user_message):
+        """Answer of a guarded message, or None. Uses only the templates already compiled"""
+        guard = check_guards(normalize_message(user_message))
+        if guard == 'illegal':
+            return ILLEGAL_RESPONSE
+        if guard == 'off_topic':
+            templates = current_templates()
+            return templates.off_topic if templates else DEFAULT_OFF_TOPIC_RESPONSE
+        return None
+
+    def generate_response_sections(self, user_message):
+        """Yield (section, text) pairs of a response as each becomes ready.
+
+        Guard and fixed answers come first as a single 'answer' section.
+        Otherwise the 'category' block rendered from the precompiled
+        templates is followed by the slower 'pdf' snippets, if any.
+        """
+        query = normalize_message(user_message)
+
+        with CHAT_STAGE_SECONDS.time(stage='guards'):
+            answer = self.guard_answer(query)
+        if answer is not None:
+            yield 'answer', answer
+            return
+
+        with CHAT_STAGE_SECONDS.time(stage='intent'):
+            intent = classify(query)
+
+        with CHAT_STAGE_SECONDS.time(stage='templates'):
+            templates = get_templates(self.db)
+
+        # Contact details and the default menu are fully precompiled
+        answer = templates.fixed_answer(intent)
+        if answer is not None:
+            yield 'answer', answer
+            return
+
+        with CHAT_STAGE_SECONDS.time(stage='render'):
+            category_response = templates.render(intent, query, self.db)
+        yield 'category', category_response
+
+        # PDF-based response (if available)
+        with CHAT_STAGE_SECONDS.time(stage='pdf_search'):
+            relevant_pdfs = self.db.get_relevant_pdfs(query, limit=3)
+        if relevant_pdfs:
+            with CHAT_STAGE_SECONDS.time(stage='pdf_snippets'):
+                pdf_response = self.generate_pdf_response(relevant_pdfs, query)
+            if pdf_response:
+                yield 'pdf', pdf_response + "\n"
+
+    def compose_response(self, sections):
+        """Join response sections in display order: PDF snippets above the category block"""
+        return ''.join(sections.get(name, '') for name in RESPONSE_SECTION_ORDER)
+
+    def generate_response(self, user_message, session_id=None):
+        """Generate a complete response using scraped data and uploaded PDFs"""
+        return self.compose_response(dict(self.generate_response_sections(user_message)))
+
+    def persist(self, session_id, user_message, response, pdf_hit, user_id=None):
+        """Save an answered message to the chat log; failures are logged, not raised"""
+        if not response or not response.strip():
+            return
+        try:
+            with CHAT_STAGE_SECONDS.time(stage='persist'):
+                self.db.save_chat_message(
+                    user_id, session_id, user_message, response,
+                    intent=self.detect_intent(user_message),
+                    pdf_hit=pdf_hit
+                )
+        except Exception as e:
+            logger.warning(f"Failed to save chat message: {e}")
+
+    def generate_pdf_response(self, pdfs, query):
+        """Generate response from uploaded PDFs"""
+        if not pdfs:
+            return ""
+
+        response = PDF_RESPONSE_HEADER + "\n\n"
+
+        # Ready-made chunk snippets for all PDFs in a single lookup
+        snippets = self.db.search_pdf_chunks(query, [pdf[0] for pdf in pdfs])
+
+        for pdf in pdfs:
+            pdf_id = pdf[0]
+            filename = pdf[2]
+            category = pdf[3]
+            tags = pdf[4]
+            description = pdf[5]
+            upload_date = pdf[7]
+
+            response += f"📋 **{filename}** (Category: {category})\n"
+
+            if description:
+                response += f"• **Description**: {description}\n"
+
+            if tags:
+                response += f"• **Tags**: {tags}\n"
+
+            response += f"• **Uploaded**: {upload_date}\n"
+
+            relevant_content = snippets.get(pdf_id)
+            if relevant_content:
+                response += "• **Relevant Content**:\n"
+                for page_num, snippet in relevant_content:  # Top 2 relevant pages
+                    response += f"  - Page {page_num}: ...{snippet}...\n"
+
+            response += "\n"
+
+        response += "💡 **Note**: This information is from uploaded PDF documents. For official updates, please check the university website.\n"
+        return response
@@ -1,13 +1,90 @@
 import sqlite3
 import json
+import os
+import threading
+import time
 from datetime import datetime
 import logging
+from text_utils import chunk_text, normalize_text, search_terms
+from metrics import CACHE_REQUESTS, count_db_query
+import sql_profiler
 
 logger = logging.getLogger(__name__)
 
+# Columns shared by chat_history and its archived monthly partitions
+CHAT_COLUMNS = 'id, user_id, session_id, user_message, bot_response, timestamp'
+
+# Rows moved per transaction when archiving, so the write lock is held briefly
+ARCHIVE_BATCH_SIZE = 5000
+
+# Heading that starts every bot answer built from uploaded PDFs
+PDF_RESPONSE_HEADER = "📄 **Relevant Information from Uploaded PDFs:**"
+
+# Directory of the uploaded PDF files, relative to the working directory
+UPLOAD_FOLDER = 'uploads'
+
+# Learned query-to-PDF cache bounds: max rows kept, and days an unused
+# learned entry stays valid (pinned entries never expire)
+QUERY_MAPPING_MAX_ROWS = 5000
+QUERY_MAPPING_TTL_DAYS = 30
+
+# Query-PDF cache hits are counted in memory and written back once this many
+# have accumulated or this many seconds have passed
+QUERY_MAPPING_HIT_FLUSH_EVERY = 100
+QUERY_MAPPING_HIT_FLUSH_INTERVAL = 30
+
+# Lists of linked items inside scraped category JSON that are searchable
+INDEXED_SECTIONS = {
+    'news_notices': ['latest_news', 'notices', 'announcements'],
+    'examinations': ['exam_schedule', 'results', 'admit_cards', 'important_notices'],
+    'courses': ['departments']
+}
+
+# Seconds a process trusts its cached scraped-data version before re-reading it
+DATA_VERSION_TTL = 5
+
+# Scraped categories the quick-info document is built from
+QUICK_INFO_CATEGORIES = ('admissions', 'courses', 'examinations', 'news_notices')
+
+def build_quick_info(scraped_data):
+    """Build the quick-info document from scraped data by category"""
+    scraped_data = scraped_data or {}
+    return {
+        'admissions': {
+            'status': 'Active' if 'admissions' in scraped_data else 'Offline',
+            'last_updated': scraped_data.get('admissions', {}).get('last_updated', 'Unknown')
+        },
+        'courses': {
+            'total_ug': len(scraped_data.get('courses', {}).get('undergraduate_programs', [])),
+            'total_pg': len(scraped_data.get('courses', {}).get('postgraduate_programs', []))
+        },
+        'exams': {
+            'status': 'Active' if 'examinations' in scraped_data else 'Offline',
+            'last_updated': scraped_data.get('examinations', {}).get('last_updated', 'Unknown')
+        },
+        'news': {
+            'latest_count': len(scraped_data.get('news_notices', {}).get('latest_news', [])),
+            'last_updated': scraped_data.get('news_notices', {}).get('last_updated', 'Unknown')
+        }
+    }
+
 class DatabaseManager:
+    # Data/settings version cache shared by all instances in this process
+    _versions = {'values': None, 'checked_at': 0.0}
+    
+    # Read-only snapshots held in memory for the version they were loaded at;
+    # loaded before a pre-fork server forks, workers share them copy-on-write
+    _quick_info = {'version': None, 'data': None}
+    _scraped_snapshot = {'version': None, 'data': None}
+    _settings_snapshot = {'version': None, 'data': None}
+    
+    # Query-PDF cache hits not yet written back: mapping id -> hits
+    _mapping_hits = {'counts': {}, 'total': 0, 'flushed_at': 0.0}
+    _mapping_hits_lock = threading.Lock()
+    
     def __init__(self, db_name='vbspu_bot.db'):
         self.db_name = db_name
+        self.archive_dir = os.path.join(os.path.dirname(os.path.abspath(db_name)), 'archive')
         self.init_database()
     
     def init_database(self):
@@ -16,6 +93,12 @@ class DatabaseManager:
             conn = sqlite3.connect(self.db_name)
             cursor = conn.cursor()
             
+            # Incremental auto-vacuum lets archival hand freed pages back to the OS
+            cursor.execute('PRAGMA auto_vacuum')
+            if cursor.fetchone()[0] != 2:
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+            
             # Users table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -53,15 +136,38 @@ class DatabaseManager:
                 )
             ''')
             
+            # Searchable index over scraped item titles (news, exam links, departments)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scraped_items (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    category TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    position INTEGER,
+                    title TEXT,
+                    url TEXT
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scraped_item_terms (
+                    term TEXT NOT NULL,
+                    item_id INTEGER NOT NULL,
+                    weight INTEGER DEFAULT 1,
+                    PRIMARY KEY (term, item_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_scraped_items_category ON scraped_items (category)')
+            
             # Bot settings table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS bot_settings (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     setting_key TEXT UNIQUE NOT NULL,
                     setting_value TEXT,
+                    description TEXT,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            self._ensure_column(cursor, 'bot_settings', 'description', 'TEXT')
             
             # Admin logs table
             cursor.execute('''
@@ -88,12 +194,24 @@ class DatabaseManager:
                     upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     uploaded_by INTEGER,
                     status TEXT DEFAULT 'active',
+                    content_hash TEXT,
+                    extraction_status TEXT,
+                    failed_pages TEXT,
                     FOREIGN KEY (uploaded_by) REFERENCES users (id)
                 )
             ''')
             
-            # PDF content table for search
+            # Content-addressed storage: one upload row per distinct file
+            self._ensure_column(cursor, 'pdf_uploads', 'content_hash', 'TEXT')
+            self._ensure_column(cursor, 'pdf_uploads', 'extraction_status', 'TEXT')
+            self._ensure_column(cursor, 'pdf_uploads', 'failed_pages', 'TEXT')
             cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_pdf_uploads_content_hash
+                ON pdf_uploads (content_hash)
+            ''')
+            
+            # PDF content table for search
+            self._create_cascading_table(cursor, 'pdf_content', '''
                 CREATE TABLE IF NOT EXISTS pdf_content (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     pdf_id INTEGER NOT NULL,
@@ -101,22 +219,169 @@ class DatabaseManager:
                     content TEXT,
                     keywords TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (pdf_id) REFERENCES pdf_uploads (id)
+                    FOREIGN KEY (pdf_id) REFERENCES pdf_uploads (id) ON DELETE CASCADE
                 )
             ''')
             
-            # Query-PDF mapping table
+            # PDF chunk table: small overlapping page segments used as ready-made snippets
+            self._create_cascading_table(cursor, 'pdf_chunks', '''
+                CREATE TABLE IF NOT EXISTS pdf_chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pdf_id INTEGER NOT NULL,
+                    page_number INTEGER,
+                    chunk_index INTEGER,
+                    start_offset INTEGER,
+                    end_offset INTEGER,
+                    text TEXT,
+                    tokens TEXT,
+                    FOREIGN KEY (pdf_id) REFERENCES pdf_uploads (id) ON DELETE CASCADE
+                )
+            ''')
             cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_pdf_chunks_pdf
+                ON pdf_chunks (pdf_id, page_number, chunk_index)
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_pdf_content_pdf ON pdf_content (pdf_id, page_number)')
+            
+            # Query-PDF mapping table
+            self._create_cascading_table(cursor, 'query_pdf_mapping', '''
                 CREATE TABLE IF NOT EXISTS query_pdf_mapping (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     query_text TEXT NOT NULL,
                     pdf_id INTEGER,
                     relevance_score REAL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (pdf_id) REFERENCES pdf_uploads (id)
+                    hits INTEGER DEFAULT 0,
+                    pinned INTEGER DEFAULT 0,
+                    last_used TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (pdf_id) REFERENCES pdf_uploads (id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Learned query cache: one row per (normalized query, pdf), pdf_id NULL caches "no match"
+            self._ensure_column(cursor, 'query_pdf_mapping', 'hits', 'INTEGER DEFAULT 0')
+            self._ensure_column(cursor, 'query_pdf_mapping', 'pinned', 'INTEGER DEFAULT 0')
+            self._ensure_column(cursor, 'query_pdf_mapping', 'last_used', 'TIMESTAMP')
+            cursor.execute('''
+                DELETE FROM query_pdf_mapping WHERE id NOT IN
+                (SELECT MAX(id) FROM query_pdf_mapping GROUP BY query_text, IFNULL(pdf_id, 0))
+            ''')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_query_pdf_mapping_query
+                ON query_pdf_mapping (query_text, IFNULL(pdf_id, 0))
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_query_pdf_mapping_pdf ON query_pdf_mapping (pdf_id)')
+            
+            # Monthly chat_history partitions moved to archive database files
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_archives (
+                    month TEXT PRIMARY KEY,
+                    archive_file TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    row_count INTEGER DEFAULT 0,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Chat analytics rollups, updated as chats are written
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_rollup_hourly (
+                    hour TEXT PRIMARY KEY,
+                    chats INTEGER DEFAULT 0,
+                    pdf_hits INTEGER DEFAULT 0
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_rollup_daily (
+                    day TEXT PRIMARY KEY,
+                    chats INTEGER DEFAULT 0,
+                    pdf_hits INTEGER DEFAULT 0,
+                    unique_sessions INTEGER DEFAULT 0
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_rollup_intents (
+                    day TEXT NOT NULL,
+                    intent TEXT NOT NULL,
+                    chats INTEGER DEFAULT 0,
+                    PRIMARY KEY (day, intent)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_rollup_sessions (
+                    day TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    PRIMARY KEY (day, session_id)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Indexes backing keyset pagination of the admin list APIs
+            keyset_indexes = {
+                'idx_chat_history_time': 'chat_history (timestamp, id)',
+                'idx_chat_history_session_time': 'chat_history (session_id, timestamp, id)',
+                'idx_chat_history_user_time': 'chat_history (user_id, timestamp, id)',
+                'idx_admin_logs_time': 'admin_logs (timestamp, id)',
+                'idx_admin_logs_admin_time': 'admin_logs (admin_id, timestamp, id)',
+                'idx_users_created': 'users (created_at, id)'
+            }
+            for index_name, index_columns in keyset_indexes.items():
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {index_columns}')
+            
+            # Cached row counters kept current by triggers, so dashboard totals
+            # don't need a full COUNT(*) scan of large tables
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
+            # Top user queries, counted by every worker process (see add_top_queries)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS top_queries (
+                    query_text TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    error INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
             
+            # Documents derived from scraped data, recomputed when it is saved
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS derived_data (
+                    name TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    data_version INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            counter_triggers = {
+                'trg_users_count_insert': "AFTER INSERT ON users BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'total_users'; END",
+                'trg_users_count_delete': "AFTER DELETE ON users BEGIN UPDATE stats_counters SET value = value - 1 WHERE name = 'total_users'; END",
+                'trg_chats_count_insert': "AFTER INSERT ON chat_history BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'total_chats'; END",
+                'trg_chats_count_delete': "AFTER DELETE ON chat_history BEGIN UPDATE stats_counters SET value = value - 1 WHERE name = 'total_chats'; END",
+                'trg_pdfs_count_insert': "AFTER INSERT ON pdf_uploads WHEN NEW.status = 'active' BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'total_pdfs'; END",
+                'trg_pdfs_count_delete': "AFTER DELETE ON pdf_uploads WHEN OLD.status = 'active' BEGIN UPDATE stats_counters SET value = value - 1 WHERE name = 'total_pdfs'; END",
+                'trg_scraped_data_version_insert': "AFTER INSERT ON scraped_data BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'scraped_data_version'; END",
+                'trg_scraped_data_version_update': "AFTER UPDATE ON scraped_data BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'scraped_data_version'; END",
+                'trg_settings_version_insert': "AFTER INSERT ON bot_settings BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'settings_version'; END",
+                'trg_settings_version_update': "AFTER UPDATE ON bot_settings BEGIN UPDATE stats_counters SET value = value + 1 WHERE name = 'settings_version'; END",
+                'trg_pdfs_count_status': "AFTER UPDATE OF status ON pdf_uploads WHEN (OLD.status = 'active') != (NEW.status = 'active') BEGIN UPDATE stats_counters SET value = value + (CASE WHEN NEW.status = 'active' THEN 1 ELSE -1 END) WHERE name = 'total_pdfs'; END"
+            }
+            for trigger_name, trigger_body in counter_triggers.items():
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {trigger_name} {trigger_body}')
+            
+            # Seed counters once from the current table sizes
+            cursor.execute('''
+                INSERT OR IGNORE INTO stats_counters (name, value)
+                SELECT 'total_users', COUNT(*) FROM users
+                UNION ALL SELECT 'total_chats', COUNT(*) FROM chat_history
+                UNION ALL SELECT 'total_pdfs', COUNT(*) FROM pdf_uploads WHERE status = 'active'
+                UNION ALL SELECT 'scraped_data_version', 1
+                UNION ALL SELECT 'settings_version', 1
+            ''')
+            
             # Insert default admin user if not exists
             cursor.execute('''
                 INSERT OR IGNORE INTO users (username, email, password_hash, role)
@@ -129,7 +394,9 @@ class DatabaseManager:
                 ('max_response_length', '500', 'Maximum character limit for responses'),
                 ('auto_scrape_interval', '3600', 'Auto scrape interval in seconds'),
                 ('welcome_message', 'नमस्ते! मैं VBSPU AI Assistant हूं। क्या जानना चाहते हैं आप?', 'Welcome message for users'),
-                ('off_topic_response', 'Main sirf VBSPU se related queries me hi madad kar sakta hoon.', 'Response for off-topic queries')
+                ('off_topic_response', 'Main sirf VBSPU se related queries me hi madad kar sakta hoon.', 'Response for off-topic queries'),
+                ('chat_hot_months', '3', 'Months of chat history kept in the main database'),
+                ('chat_retention_months', '24', 'Months of chat history kept at all (0 keeps everything)')
             ]
             
             for key, value, desc in default_settings:
@@ -139,15 +406,111 @@ class DatabaseManager:
                 ''', (key, value, desc))
             
             conn.commit()
+            
+            # Chunk pages that were ingested before the chunk table existed
+            self._backfill_pdf_chunks(cursor)
+            
+            # Roll up chats written before the rollup tables existed
+            cursor.execute('SELECT COUNT(*) FROM chat_rollup_daily')
+            if cursor.fetchone()[0] == 0:
+                self._rebuild_chat_rollups(cursor)
+            
+            # Index scraped data saved before the item index existed
+            cursor.execute('SELECT COUNT(*) FROM scraped_items')
+            if cursor.fetchone()[0] == 0:
+                cursor.execute('SELECT category, data FROM scraped_data')
+                for category, data_json in cursor.fetchall():
+                    self._rebuild_item_index(cursor, category, json.loads(data_json))
+            
+            # Materialize quick info for data saved before it was precomputed
+            cursor.execute("SELECT 1 FROM derived_data WHERE name = 'quick_info'")
+            if not cursor.fetchone():
+                self._refresh_quick_info(cursor)
+            conn.commit()
             conn.close()
             logger.info("Database initialized successfully")
             
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
     
+    def _ensure_column(self, cursor, table, column, definition):
+        """Add a column to an existing table if an older schema lacks it"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    
+    def _create_cascading_table(self, cursor, table, create_sql):
+        """Create a PDF child table, rebuilding an older copy that lacks ON DELETE CASCADE"""
+        cursor.execute(create_sql)
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if 'ON DELETE CASCADE' in cursor.fetchone()[0].upper():
+            return
+        
+        # SQLite can't alter a foreign key, so copy the rows into a fresh table
+        cursor.execute(f'PRAGMA table_info({table})')
+        old_columns = [row[1] for row in cursor.fetchall()]
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_old')
+        cursor.execute(create_sql)
+        cursor.execute(f'PRAGMA table_info({table})')
+        columns = ', '.join(row[1] for row in cursor.fetchall() if row[1] in old_columns)
+        cursor.execute(f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_old')
+        cursor.execute(f'DROP TABLE {table}_old')
+        logger.info(f"Rebuilt {table} with ON DELETE CASCADE")
+    
+    def _backfill_pdf_chunks(self, cursor):
+        """Create chunks for stored PDF pages that have none yet"""
+        cursor.execute('''
+            SELECT pdf_id, page_number, content FROM pdf_content
+            WHERE pdf_id NOT IN (SELECT DISTINCT pdf_id FROM pdf_chunks)
+        ''')
+        for pdf_id, page_number, content in cursor.fetchall():
+            self._insert_pdf_chunks(cursor, pdf_id, page_number, content)
+    
+    def _insert_pdf_chunks(self, cursor, pdf_id, page_number, content):
+        """Segment a page into overlapping chunks and store them"""
+        cursor.executemany('''
+            INSERT INTO pdf_chunks (pdf_id, page_number, chunk_index, start_offset, end_offset, text, tokens)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(pdf_id, page_number, index, start, end, text, tokens)
+              for index, (start, end, text, tokens) in enumerate(chunk_text(content))])
+    
+    def _rebuild_item_index(self, cursor, category, data):
+        """Replace the search index entries of one scraped category"""
+        cursor.execute('''
+            DELETE FROM scraped_item_terms WHERE item_id IN
+            (SELECT id FROM scraped_items WHERE category = ?)
+        ''', (category,))
+        cursor.execute('DELETE FROM scraped_items WHERE category = ?', (category,))
+        
+        if not isinstance(data, dict):
+            return
+        for section in INDEXED_SECTIONS.get(category, []):
+            for position, item in enumerate(data.get(section) or []):
+                if not isinstance(item, dict):
+                    continue
+                title = item.get('title') or item.get('name')
+                if not title:
+                    continue
+                cursor.execute('''
+                    INSERT INTO scraped_items (category, section, position, title, url)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (category, section, position, title, item.get('url')))
+                item_id = cursor.lastrowid
+                
+                # Title terms weigh more than the section name ("results", "admit cards")
+                terms = {term: 1 for term in search_terms(section.replace('_', ' '))}
+                terms.update({term: 2 for term in search_terms(title)})
+                cursor.executemany('INSERT INTO scraped_item_terms (term, item_id, weight) VALUES (?, ?, ?)',
+                                   [(term, item_id, weight) for term, weight in terms.items()])
+    
     def get_connection(self):
-        """Get database connection"""
-        return sqlite3.connect(self.db_name)
+        """Get database connection (profiled when SQL profiling is enabled)"""
+        if sql_profiler.is_enabled():
+            conn = sqlite3.connect(self.db_name, factory=sql_profiler.ProfilingConnection)
+        else:
+            conn = sqlite3.connect(self.db_name)
+        conn.set_trace_callback(count_db_query)
+        return conn
     
     # User management
     def create_user(self, username, email, password_hash, role='user'):
@@ -331,7 +694,7 @@ class DatabaseManager:
             return None
     
     # Chat history
-    def save_chat_message(self, user_id, session_id, user_message, bot_response):
+    def save_chat_message(self, user_id, session_id, user_message, bot_response, intent=None, pdf_hit=False):
         """Save chat message to database"""
         try:
             conn = self.get_connection()
@@ -340,11 +703,144 @@ class DatabaseManager:
                 INSERT INTO chat_history (user_id, session_id, user_message, bot_response)
                 VALUES (?, ?, ?, ?)
             ''', (user_id, session_id, user_message, bot_response))
+            cursor.execute('SELECT timestamp FROM chat_history WHERE id = ?', (cursor.lastrowid,))
+            self._update_chat_rollups(cursor, cursor.fetchone()[0], session_id, intent, pdf_hit)
             conn.commit()
             conn.close()
         except Exception as e:
             logger.error(f"Error saving chat message: {e}")
     
+    def _update_chat_rollups(self, cursor, timestamp, session_id, intent, pdf_hit):
+        """Add one chat to the hourly, daily, intent and session rollups"""
+        day, hour = timestamp[:10], timestamp[:13]
+        pdf_hit = int(bool(pdf_hit))
+        
+        cursor.execute('''
+            INSERT INTO chat_rollup_hourly (hour, chats, pdf_hits) VALUES (?, 1, ?)
+            ON CONFLICT (hour) DO UPDATE SET chats = chats + 1, pdf_hits = pdf_hits + excluded.pdf_hits
+        ''', (hour, pdf_hit))
+        
+        new_session = 0
+        if session_id:
+            cursor.execute('INSERT OR IGNORE INTO chat_rollup_sessions (day, session_id) VALUES (?, ?)',
+                           (day, session_id))
+            new_session = cursor.rowcount
+        
+        cursor.execute('''
+            INSERT INTO chat_rollup_daily (day, chats, pdf_hits, unique_sessions) VALUES (?, 1, ?, ?)
+            ON CONFLICT (day) DO UPDATE SET
+                chats = chats + 1,
+                pdf_hits = pdf_hits + excluded.pdf_hits,
+                unique_sessions = unique_sessions + excluded.unique_sessions
+        ''', (day, pdf_hit, new_session))
+        
+        cursor.execute('''
+            INSERT INTO chat_rollup_intents (day, intent, chats) VALUES (?, ?, 1)
+            ON CONFLICT (day, intent) DO UPDATE SET chats = chats + 1
+        ''', (day, intent or 'unknown'))
+    
+    def _rebuild_chat_rollups(self, cursor):
+        """Recompute all rollups from chat_history (intent of old chats is unknown)"""
+        for table in ('chat_rollup_hourly', 'chat_rollup_daily', 'chat_rollup_intents', 'chat_rollup_sessions'):
+            cursor.execute(f'DELETE FROM {table}')
+        
+        pdf_hit = f"bot_response LIKE '{PDF_RESPONSE_HEADER}%'"
+        cursor.execute(f'''
+            INSERT INTO chat_rollup_hourly (hour, chats, pdf_hits)
+            SELECT substr(timestamp, 1, 13), COUNT(*), SUM({pdf_hit})
+            FROM chat_history GROUP BY 1
+        ''')
+        cursor.execute('''
+            INSERT INTO chat_rollup_sessions (day, session_id)
+            SELECT DISTINCT substr(timestamp, 1, 10), session_id
+            FROM chat_history WHERE session_id IS NOT NULL
+        ''')
+        cursor.execute(f'''
+            INSERT INTO chat_rollup_daily (day, chats, pdf_hits, unique_sessions)
+            SELECT substr(timestamp, 1, 10), COUNT(*), SUM({pdf_hit}), COUNT(DISTINCT session_id)
+            FROM chat_history GROUP BY 1
+        ''')
+        cursor.execute('''
+            INSERT INTO chat_rollup_intents (day, intent, chats)
+            SELECT substr(timestamp, 1, 10), 'unknown', COUNT(*)
+            FROM chat_history GROUP BY 1
+        ''')
+    
+    def compact_chat_rollups(self, keep_session_days=2):
+        """Periodic compaction: drop per-session markers of closed days.
+
+        Daily unique-session counts are already rolled up, so the markers are
+        only needed for days that can still receive chats.
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM chat_rollup_sessions WHERE day < date('now', ?)
+            ''', (f'-{keep_session_days} days',))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error compacting chat rollups: {e}")
+            return False
+    
+    def rebuild_chat_rollups(self):
+        """Recompute the analytics rollups from the full chat history"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._rebuild_chat_rollups(cursor)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error rebuilding chat rollups: {e}")
+            return False
+    
+    def get_chat_analytics(self, days=7, hours=48):
+        """Get chat volume, intent mix, PDF-hit rate and unique sessions from the rollups"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT day, chats, pdf_hits, unique_sessions FROM chat_rollup_daily
+                WHERE day >= date('now', ?) ORDER BY day
+            ''', (f'-{days - 1} days',))
+            daily = [{'day': row[0], 'chats': row[1], 'pdf_hits': row[2], 'unique_sessions': row[3]}
+                     for row in cursor.fetchall()]
+            
+            cursor.execute('''
+                SELECT hour, chats, pdf_hits FROM chat_rollup_hourly
+                WHERE hour >= strftime('%Y-%m-%d %H', 'now', ?) ORDER BY hour
+            ''', (f'-{hours - 1} hours',))
+            hourly = [{'hour': row[0], 'chats': row[1], 'pdf_hits': row[2]} for row in cursor.fetchall()]
+            
+            cursor.execute('''
+                SELECT intent, SUM(chats) FROM chat_rollup_intents
+                WHERE day >= date('now', ?) GROUP BY intent ORDER BY 2 DESC, 1
+            ''', (f'-{days - 1} days',))
+            # A list, not a dict: jsonify sorts dict keys and would lose the count order
+            intents = [{'intent': intent, 'chats': chats} for intent, chats in cursor.fetchall()]
+            conn.close()
+            
+            total_chats = sum(row['chats'] for row in daily)
+            total_pdf_hits = sum(row['pdf_hits'] for row in daily)
+            return {
+                'days': days,
+                'total_chats': total_chats,
+                'pdf_hit_rate': round(total_pdf_hits / total_chats, 4) if total_chats else 0,
+                # Sum of per-day unique sessions
+                'unique_sessions': sum(row['unique_sessions'] for row in daily),
+                'daily': daily,
+                'hourly': hourly,
+                'intents': intents
+            }
+        except Exception as e:
+            logger.error(f"Error getting chat analytics: {e}")
+            return {}
+    
     def get_chat_history(self, user_id=None, session_id=None, limit=50):
         """Get chat history"""
         try:
@@ -388,7 +884,426 @@ class DatabaseManager:
             logger.error(f"Error getting chat history: {e}")
             return []
     
+    def _keyset_page(self, select_sql, time_column, id_column, conditions, params, limit, after=None, start=None, end=None):
+        """Run a newest-first keyset-paginated query.
+
+        after is the (timestamp, id) key of the last row of the previous page;
+        start/end bound the timestamp (a bare YYYY-MM-DD end includes that day).
+        Returns (rows, next_key) where next_key is None on the last page. The
+        selected columns must start with id and timestamp. select_sql may be a
+        callable that receives the connection and returns the SQL.
+        """
+        conditions = list(conditions)
+        params = list(params)
+        if start:
+            conditions.append(f'{time_column} >= ?')
+            params.append(start)
+        if end:
+            if len(end) == 10:
+                conditions.append(f"{time_column} < date(?, '+1 day')")
+            else:
+                conditions.append(f'{time_column} <= ?')
+            params.append(end)
+        if after:
+            conditions.append(f'({time_column}, {id_column}) < (?, ?)')
+            params.extend(after)
+        
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        if callable(select_sql):
+            select_sql = select_sql(conn)
+        cursor.execute(f'''
+            {select_sql}{where}
+            ORDER BY {time_column} DESC, {id_column} DESC LIMIT ?
+        ''', (*params, limit + 1))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1][1], rows[-1][0])
+        return rows, next_key
+    
+    def get_chat_history_page(self, limit=100, after=None, session_id=None, user_id=None, start=None, end=None,
+                              include_archive=False):
+        """Get one keyset page of chat history, newest first"""
+        try:
+            conditions, params = [], []
+            if session_id:
+                conditions.append('session_id = ?')
+                params.append(session_id)
+            if user_id:
+                conditions.append('user_id = ?')
+                params.append(user_id)
+            
+            rows, next_key = self._keyset_page(
+                lambda conn: 'SELECT id, timestamp, user_message, bot_response, session_id, user_id '
+                             f'FROM {self._chat_source(conn, start, end, include_archive)}',
+                'timestamp', 'id', conditions, params, limit, after, start, end
+            )
+            return [{
+                'id': row[0],
+                'timestamp': row[1],
+                'user_message': row[2],
+                'bot_response': row[3],
+                'session_id': row[4],
+                'user_id': row[5]
+            } for row in rows], next_key
+        except Exception as e:
+            logger.error(f"Error getting chat history page: {e}")
+            return [], None
+    
+    def sample_chat_messages(self, limit=200):
+        """Get a random sample of distinct user messages from the hot chat history"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT user_message FROM chat_history
+                GROUP BY user_message
+                ORDER BY RANDOM()
+                LIMIT ?
+            ''', (limit,))
+            results = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return results
+        except Exception as e:
+            logger.error(f"Error sampling chat messages: {e}")
+            return []
+    
+    def iter_chat_history(self, session_id=None, user_id=None, start=None, end=None, batch_size=1000,
+                          include_archive=False):
+        """Yield chat history rows oldest first, in keyset batches.
+
+        Each batch is a short independent query, so a long export neither
+        holds the whole result in memory nor keeps a read lock on the database.
+        """
+        conditions, params = [], []
+        if session_id:
+            conditions.append('session_id = ?')
+            params.append(session_id)
+        if user_id:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if start:
+            conditions.append('timestamp >= ?')
+            params.append(start)
+        if end:
+            conditions.append("timestamp < date(?, '+1 day')" if len(end) == 10 else 'timestamp <= ?')
+            params.append(end)
+        
+        last_key = None
+        while True:
+            batch_conditions = list(conditions)
+            batch_params = list(params)
+            if last_key:
+                batch_conditions.append('(timestamp, id) > (?, ?)')
+                batch_params.extend(last_key)
+            where = f" WHERE {' AND '.join(batch_conditions)}" if batch_conditions else ''
+            
+            conn = self.get_connection()
+            try:
+                source = self._chat_source(conn, start, end, include_archive)
+                rows = conn.execute(f'''
+                    SELECT id, timestamp, session_id, user_id, user_message, bot_response
+                    FROM {source}{where}
+                    ORDER BY timestamp, id LIMIT ?
+                ''', (*batch_params, batch_size)).fetchall()
+            finally:
+                conn.close()
+            
+            for row in rows:
+                yield {
+                    'id': row[0],
+                    'timestamp': row[1],
+                    'session_id': row[2],
+                    'user_id': row[3],
+                    'user_message': row[4],
+                    'bot_response': row[5]
+                }
+            
+            if len(rows) < batch_size:
+                break
+            last_key = (rows[-1][1], rows[-1][0])
+    
+    # Chat history partitioning and retention
+    def _archive_file(self, year):
+        """Path of the archive database holding one year's monthly partitions"""
+        return os.path.join(self.archive_dir, f'chat_archive_{year}.db')
+    
+    def get_archived_months(self, start=None, end=None):
+        """Get archived (month, archive_file, table_name) overlapping a date range"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT month, archive_file, table_name FROM chat_archives
+                WHERE (? IS NULL OR month >= substr(?, 1, 7))
+                AND (? IS NULL OR month <= substr(?, 1, 7))
+                ORDER BY month
+            ''', (start, start, end, end))
+            months = cursor.fetchall()
+            conn.close()
+            return months
+        except Exception as e:
+            logger.error(f"Error getting archived months: {e}")
+            return []
+    
+    def _chat_source(self, conn, start=None, end=None, include_archive=False):
+        """Attach the archives a query needs and return the table expression to select from.
+
+        Archives are attached when explicitly requested or when a date range
+        (from either bound) overlaps an archived month.
+        """
+        archived = self.get_archived_months(start, end)
+        if not archived or not (include_archive or start or end):
+            return 'chat_history'
+        
+        parts = [f'SELECT {CHAT_COLUMNS} FROM main.chat_history']
+        aliases = {}
+        for month, archive_file, table_name in archived:
+            if archive_file not in aliases:
+                aliases[archive_file] = f'archive_{len(aliases)}'
+                conn.execute('ATTACH DATABASE ? AS ' + aliases[archive_file], (archive_file,))
+            parts.append(f'SELECT {CHAT_COLUMNS} FROM {aliases[archive_file]}.{table_name}')
+        return f"({' UNION ALL '.join(parts)})"
+    
+    def archive_chat_history(self, hot_months=None):
+        """Move chat months older than the hot window into yearly archive files.
+
+        Each month becomes its own table (chat_history_YYYY_MM) in
+        archive/chat_archive_YYYY.db. Rows move in small batches and freed
+        pages are released with an incremental vacuum. Returns the number of
+        rows moved.
+        """
+        if hot_months is None:
+            hot_months = int(self.get_setting('chat_hot_months') or 3)
+        moved = 0
+        try:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT DISTINCT substr(timestamp, 1, 7) FROM chat_history
+                WHERE timestamp < date('now', 'start of month', ?)
+                ORDER BY 1
+            ''', (f'-{max(hot_months - 1, 0)} months',))
+            months = [row[0] for row in cursor.fetchall()]
+            
+            for month in months:
+                archive_file = self._archive_file(month[:4])
+                table_name = f"chat_history_{month.replace('-', '_')}"
+                cursor.execute('ATTACH DATABASE ? AS archive', (archive_file,))
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS archive.{table_name} (
+                        id INTEGER PRIMARY KEY,
+                        user_id INTEGER,
+                        session_id TEXT,
+                        user_message TEXT,
+                        bot_response TEXT,
+                        timestamp TIMESTAMP
+                    )
+                ''')
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS archive.idx_{table_name}_time ON {table_name} (timestamp, id)')
+                
+                month_rows = 0
+                while True:
+                    cursor.execute('''
+                        SELECT MIN(id), MAX(id), COUNT(*) FROM (
+                            SELECT id FROM main.chat_history
+                            WHERE substr(timestamp, 1, 7) = ? ORDER BY id LIMIT ?
+                        )
+                    ''', (month, ARCHIVE_BATCH_SIZE))
+                    first_id, last_id, count = cursor.fetchone()
+                    if not count:
+                        break
+                    
+                    cursor.execute(f'''
+                        INSERT OR REPLACE INTO archive.{table_name} ({CHAT_COLUMNS})
+                        SELECT {CHAT_COLUMNS} FROM main.chat_history
+                        WHERE id BETWEEN ? AND ? AND substr(timestamp, 1, 7) = ?
+                    ''', (first_id, last_id, month))
+                    cursor.execute('''
+                        DELETE FROM main.chat_history
+                        WHERE id BETWEEN ? AND ? AND substr(timestamp, 1, 7) = ?
+                    ''', (first_id, last_id, month))
+                    
+                    # Archived chats still count towards the total
+                    cursor.execute("UPDATE stats_counters SET value = value + ? WHERE name = 'total_chats'", (count,))
+                    cursor.execute('''
+                        INSERT INTO chat_archives (month, archive_file, table_name, row_count)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (month) DO UPDATE SET
+                            row_count = row_count + excluded.row_count,
+                            archived_at = CURRENT_TIMESTAMP
+                    ''', (month, archive_file, table_name, count))
+                    conn.commit()
+                    month_rows += count
+                
+                cursor.execute('DETACH DATABASE archive')
+                moved += month_rows
+                logger.info(f"Archived {month_rows} chats from {month} to {archive_file}")
+            
+            # executescript steps the pragma to completion; execute() frees a single page
+            conn.executescript('PRAGMA incremental_vacuum')
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error archiving chat history: {e}")
+        return moved
+    
+    def apply_chat_retention(self, retention_months=None):
+        """Drop archived months older than the retention window. Returns months dropped."""
+        if retention_months is None:
+            retention_months = int(self.get_setting('chat_retention_months') or 0)
+        if retention_months <= 0:
+            return 0
+        dropped = 0
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT month, archive_file, table_name, row_count FROM chat_archives
+                WHERE month < strftime('%Y-%m', 'now', 'start of month', ?)
+            ''', (f'-{retention_months - 1} months',))
+            
+            for month, archive_file, table_name, row_count in cursor.fetchall():
+                if os.path.exists(archive_file):
+                    archive = sqlite3.connect(archive_file)
+                    archive.execute(f'DROP TABLE IF EXISTS {table_name}')
+                    remaining = archive.execute(
+                        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table'"
+                    ).fetchone()[0]
+                    archive.commit()
+                    if remaining:
+                        archive.execute('VACUUM')
+                    archive.close()
+                    if not remaining:
+                        os.remove(archive_file)
+                
+                cursor.execute('DELETE FROM chat_archives WHERE month = ?', (month,))
+                cursor.execute("UPDATE stats_counters SET value = value - ? WHERE name = 'total_chats'", (row_count,))
+                conn.commit()
+                dropped += 1
+                logger.info(f"Dropped archived chats for {month} (retention {retention_months} months)")
+            
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error applying chat retention: {e}")
+        return dropped
+    
+    def run_chat_maintenance(self):
+        """Periodic job: archive old months, apply retention, compact rollups and finish interrupted PDF deletes"""
+        return {
+            'archived_rows': self.archive_chat_history(),
+            'dropped_months': self.apply_chat_retention(),
+            'rollups_compacted': self.compact_chat_rollups(),
+            'pdfs_deleted': self.finish_pdf_deletions()
+        }
+    
+    # Top queries tracker persistence
+    def add_top_queries(self, increments, capacity):
+        """Add one process's {query: count} increments to the shared top-queries counters.
+
+        Counts are added in SQL, so workers never overwrite each other. Once
+        `capacity` queries are stored, a new query replaces the least frequent
+        one and inherits its count as the overestimation error (Space-Saving).
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            # Take the write lock up front so concurrent workers evict one at a time
+            cursor.execute('BEGIN IMMEDIATE')
+            placeholders = ','.join('?' * len(increments))
+            cursor.execute(f'SELECT query_text FROM top_queries WHERE query_text IN ({placeholders})', list(increments))
+            stored = {row[0] for row in cursor.fetchall()}
+            cursor.execute('SELECT COUNT(*) FROM top_queries')
+            size = cursor.fetchone()[0]
+            
+            for query, count in sorted(increments.items(), key=lambda item: -item[1]):
+                floor = 0
+                if query not in stored:
+                    if size >= capacity:
+                        cursor.execute('SELECT query_text, count FROM top_queries ORDER BY count, updated_at LIMIT 1')
+                        victim, floor = cursor.fetchone()
+                        cursor.execute('DELETE FROM top_queries WHERE query_text = ?', (victim,))
+                    else:
+                        size += 1
+                cursor.execute('''
+                    INSERT INTO top_queries (query_text, count, error) VALUES (?, ?, ?)
+                    ON CONFLICT (query_text) DO UPDATE SET
+                        count = count + excluded.count,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (query, floor + count, floor))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving top queries: {e}")
+            return False
+    
+    def get_top_queries(self, limit=None):
+        """Get the top-queries counters as (query, count, error), most frequent first"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT query_text, count, error FROM top_queries
+                ORDER BY count DESC, error LIMIT ?
+            ''', (limit or -1,))
+            results = cursor.fetchall()
+            conn.close()
+            return results
+        except Exception as e:
+            logger.error(f"Error getting top queries: {e}")
+            return []
+    
+    def get_top_queries_total(self):
+        """Get the number of queries counted by the top-queries counters"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT IFNULL(SUM(count), 0) FROM top_queries')
+            total = cursor.fetchone()[0]
+            conn.close()
+            return total
+        except Exception as e:
+            logger.error(f"Error counting top queries: {e}")
+            return 0
+    
     # Scraped data management
+    def _get_versions(self):
+        """Get the scraped-data and settings versions, bumped by triggers on every change.
+
+        The values are cached per process for DATA_VERSION_TTL seconds, and
+        reset at once when this process saves scraped data or settings.
+        """
+        cache = DatabaseManager._versions
+        now = time.monotonic()
+        if cache['values'] is not None and now - cache['checked_at'] < DATA_VERSION_TTL:
+            return cache['values']
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT name, value FROM stats_counters WHERE name IN ('scraped_data_version', 'settings_version')")
+            cache['values'] = dict(cursor.fetchall())
+            cache['checked_at'] = now
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error getting data version: {e}")
+            return cache['values'] or {}
+        return cache['values']
+    
+    def get_data_version(self):
+        """Get the scraped-data version"""
+        return self._get_versions().get('scraped_data_version', 0)
+    
+    def get_settings_version(self):
+        """Get the bot settings version"""
+        return self._get_versions().get('settings_version', 0)
+    
     def save_scraped_data(self, category, data, source_url=None):
         """Save scraped data"""
         try:
@@ -415,13 +1330,27 @@ class DatabaseManager:
                     VALUES (?, ?, ?)
                 ''', (category, data_json, source_url))
             
+            self._rebuild_item_index(cursor, category, data)
+            if category in QUICK_INFO_CATEGORIES:
+                self._refresh_quick_info(cursor)
             conn.commit()
             conn.close()
+            DatabaseManager._versions['values'] = None
         except Exception as e:
             logger.error(f"Error saving scraped data: {e}")
     
     def get_scraped_data(self, category=None):
-        """Get scraped data"""
+        """Get scraped data.
+
+        All categories are served from an in-memory snapshot while the data
+        version is unchanged; treat the returned data as read-only.
+        """
+        version = self.get_data_version()
+        snapshot = DatabaseManager._scraped_snapshot
+        if snapshot['data'] is not None and snapshot['version'] == version:
+            CACHE_REQUESTS.inc(cache='scraped_data', result='hit')
+            return snapshot['data'].get(category) if category else snapshot['data']
+        CACHE_REQUESTS.inc(cache='scraped_data', result='miss')
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -443,40 +1372,132 @@ class DatabaseManager:
                 data = {}
                 for category, data_json, updated_at in results:
                     data[category] = json.loads(data_json)
+                snapshot['version'], snapshot['data'] = version, data
                 return data
         except Exception as e:
             logger.error(f"Error loading from database: {e}")
             return None if category else {}
     
-    # Bot settings
-    def get_setting(self, key):
-        """Get bot setting"""
+    def _refresh_quick_info(self, cursor):
+        """Recompute and store the quick-info document at the current data version"""
+        placeholders = ','.join('?' * len(QUICK_INFO_CATEGORIES))
+        cursor.execute(f'SELECT category, data FROM scraped_data WHERE category IN ({placeholders})',
+                       QUICK_INFO_CATEGORIES)
+        quick_info = build_quick_info({category: json.loads(data_json) for category, data_json in cursor.fetchall()})
+        cursor.execute("SELECT value FROM stats_counters WHERE name = 'scraped_data_version'")
+        row = cursor.fetchone()
+        cursor.execute('''
+            INSERT OR REPLACE INTO derived_data (name, data, data_version, updated_at)
+            VALUES ('quick_info', ?, ?, CURRENT_TIMESTAMP)
+        ''', (json.dumps(quick_info), row[0] if row else 0))
+        return quick_info
+    
+    def get_quick_info(self):
+        """Get the precomputed quick-info document, served from memory while the data version is unchanged"""
+        version = self.get_data_version()
+        cache = DatabaseManager._quick_info
+        if cache['data'] is not None and cache['version'] == version:
+            CACHE_REQUESTS.inc(cache='quick_info', result='hit')
+            return cache['data']
+        CACHE_REQUESTS.inc(cache='quick_info', result='miss')
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT setting_value FROM bot_settings WHERE setting_key = ?
-            ''', (key,))
-            result = cursor.fetchone()
+            cursor.execute("SELECT data FROM derived_data WHERE name = 'quick_info'")
+            row = cursor.fetchone()
+            if row:
+                quick_info = json.loads(row[0])
+            else:
+                quick_info = self._refresh_quick_info(cursor)
+                conn.commit()
             conn.close()
-            return result[0] if result else None
+            cache['version'], cache['data'] = version, quick_info
+            return quick_info
         except Exception as e:
-            logger.error(f"Error getting setting: {e}")
-            return None
+            logger.error(f"Error getting quick info: {e}")
+            return cache['data'] or build_quick_info({})
     
-    # PDF Management Functions
-    def save_pdf_upload(self, filename, original_filename, category, tags, description, file_size, uploaded_by):
-        """Save PDF upload information"""
+    def search_scraped_items(self, query, categories=None, limit=5):
+        """Search indexed scraped items, ranked by weighted matching query terms.
+
+        Only items whose title matches at least one term are returned.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO pdf_uploads (filename, original_filename, category, tags, description, file_size, uploaded_by)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (filename, original_filename, category, tags, description, file_size, uploaded_by))
-            pdf_id = cursor.lastrowid
-            conn.commit()
+            
+            term_placeholders = ','.join('?' * len(terms))
+            params = list(terms)
+            category_filter = ''
+            if categories:
+                category_filter = f"AND i.category IN ({','.join('?' * len(categories))})"
+                params.extend(categories)
+            params.append(limit)
+            
+            cursor.execute(f'''
+                SELECT i.category, i.section, i.title, i.url, SUM(t.weight) AS score
+                FROM scraped_item_terms t
+                JOIN scraped_items i ON i.id = t.item_id
+                WHERE t.term IN ({term_placeholders}) {category_filter}
+                GROUP BY i.id
+                HAVING MAX(t.weight) > 1
+                ORDER BY score DESC, i.position
+                LIMIT ?
+            ''', params)
+            results = cursor.fetchall()
             conn.close()
+            
+            return [{
+                'category': row[0],
+                'section': row[1],
+                'title': row[2],
+                'url': row[3],
+                'score': row[4]
+            } for row in results]
+        except Exception as e:
+            logger.error(f"Error searching scraped items: {e}")
+            return []
+    
+    # Bot settings
+    def get_setting(self, key):
+        """Get bot setting, served from an in-memory snapshot while the settings version is unchanged"""
+        version = self.get_settings_version()
+        snapshot = DatabaseManager._settings_snapshot
+        if snapshot['data'] is None or snapshot['version'] != version:
+            CACHE_REQUESTS.inc(cache='settings', result='miss')
+            try:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.execute('SELECT setting_key, setting_value FROM bot_settings')
+                snapshot['data'] = dict(cursor.fetchall())
+                snapshot['version'] = version
+                conn.close()
+            except Exception as e:
+                logger.error(f"Error getting setting: {e}")
+                return None
+        else:
+            CACHE_REQUESTS.inc(cache='settings', result='hit')
+        return snapshot['data'].get(key)
+    
+    # PDF Management Functions
+    def save_pdf_upload(self, filename, original_filename, category, tags, description, file_size, uploaded_by, content_hash=None):
+        """Save PDF upload information"""
+        try:
+            conn = self.get_connection()
+            # Closed even when the insert fails (duplicate content_hash), so no write lock is left behind
+            try:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO pdf_uploads (filename, original_filename, category, tags, description, file_size, uploaded_by, content_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (filename, original_filename, category, tags, description, file_size, uploaded_by, content_hash))
+                pdf_id = cursor.lastrowid
+                conn.commit()
+            finally:
+                conn.close()
             return pdf_id
         except Exception as e:
             logger.error(f"Error saving PDF upload: {e}")
@@ -504,6 +1525,55 @@ class DatabaseManager:
             logger.error(f"Error getting PDF uploads: {e}")
             return []
     
+    def get_pdf_by_hash(self, content_hash):
+        """Get the upload that already stores a file with this content hash"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM pdf_uploads WHERE content_hash = ?', (content_hash,))
+            pdf = cursor.fetchone()
+            conn.close()
+            return pdf
+        except Exception as e:
+            logger.error(f"Error getting PDF by hash: {e}")
+            return None
+    
+    def update_pdf_metadata(self, pdf_id, category=None, tags=None, description=None):
+        """Update category/tags/description of an existing upload, keeping its content"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE pdf_uploads
+                SET category = COALESCE(NULLIF(?, ''), category),
+                    tags = COALESCE(NULLIF(?, ''), tags),
+                    description = COALESCE(NULLIF(?, ''), description),
+                    status = 'active'
+                WHERE id = ?
+            ''', (category, tags, description, pdf_id))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating PDF metadata: {e}")
+            return False
+    
+    def update_pdf_extraction_status(self, pdf_id, status, failed_pages=None):
+        """Record how text extraction of an upload went and which pages failed"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE pdf_uploads SET extraction_status = ?, failed_pages = ?
+                WHERE id = ?
+            ''', (status, json.dumps(failed_pages or []), pdf_id))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating PDF extraction status: {e}")
+            return False
+    
     def save_pdf_content(self, pdf_id, page_number, content, keywords):
         """Save PDF content for search"""
         try:
@@ -513,23 +1583,39 @@ class DatabaseManager:
                 INSERT INTO pdf_content (pdf_id, page_number, content, keywords)
                 VALUES (?, ?, ?, ?)
             ''', (pdf_id, page_number, content, keywords))
+            self._insert_pdf_chunks(cursor, pdf_id, page_number, content)
             conn.commit()
             conn.close()
         except Exception as e:
             logger.error(f"Error saving PDF content: {e}")
     
+    def clear_pdf_content(self, pdf_id):
+        """Remove the extracted pages and chunks of an upload before it is extracted again"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM pdf_chunks WHERE pdf_id = ?', (pdf_id,))
+            cursor.execute('DELETE FROM pdf_content WHERE pdf_id = ?', (pdf_id,))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing PDF content: {e}")
+            return False
+    
     def search_pdf_content(self, query):
         """Search PDF content based on query"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Search in content and keywords
+            # Search in content and keywords of active uploads, as the chat path does
             cursor.execute('''
-                SELECT DISTINCT pdf_id, content, page_number, keywords
-                FROM pdf_content 
-                WHERE content LIKE ? OR keywords LIKE ?
-                ORDER BY page_number
+                SELECT DISTINCT c.pdf_id, c.content, c.page_number, c.keywords
+                FROM pdf_content c
+                JOIN pdf_uploads p ON p.id = c.pdf_id
+                WHERE (c.content LIKE ? OR c.keywords LIKE ?) AND p.status = 'active'
+                ORDER BY c.page_number
             ''', (f'%{query}%', f'%{query}%'))
             
             results = cursor.fetchall()
@@ -539,40 +1625,133 @@ class DatabaseManager:
             logger.error(f"Error searching PDF content: {e}")
             return []
     
-    def save_query_pdf_mapping(self, query_text, pdf_id, relevance_score):
+    def search_pdf_chunks(self, query, pdf_ids, per_pdf=2):
+        """Get matching chunk snippets for the given PDFs, at most one per page"""
+        if not pdf_ids:
+            return {}
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            placeholders = ','.join('?' * len(pdf_ids))
+            cursor.execute(f'''
+                SELECT pdf_id, page_number, text
+                FROM pdf_chunks
+                WHERE pdf_id IN ({placeholders}) AND tokens LIKE ?
+                ORDER BY pdf_id, page_number, chunk_index
+            ''', (*pdf_ids, f'%{normalize_text(query)}%'))
+            
+            snippets = {}
+            for pdf_id, page_number, text in cursor.fetchall():
+                pdf_snippets = snippets.setdefault(pdf_id, [])
+                if len(pdf_snippets) < per_pdf and all(page != page_number for page, _ in pdf_snippets):
+                    pdf_snippets.append((page_number, text))
+            
+            conn.close()
+            return snippets
+        except Exception as e:
+            logger.error(f"Error searching PDF chunks: {e}")
+            return {}
+    
+    def save_query_pdf_mapping(self, query_text, pdf_id, relevance_score, pinned=False):
         """Save query-PDF mapping"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO query_pdf_mapping (query_text, pdf_id, relevance_score)
-                VALUES (?, ?, ?)
-            ''', (query_text, pdf_id, relevance_score))
+                INSERT INTO query_pdf_mapping (query_text, pdf_id, relevance_score, pinned, last_used)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (query_text, IFNULL(pdf_id, 0)) DO UPDATE SET
+                    relevance_score = excluded.relevance_score,
+                    pinned = MAX(pinned, excluded.pinned),
+                    last_used = CURRENT_TIMESTAMP
+            ''', (normalize_text(query_text), pdf_id, relevance_score, int(pinned)))
             conn.commit()
             conn.close()
+            return True
         except Exception as e:
             logger.error(f"Error saving query-PDF mapping: {e}")
+            return False
+    
+    def _count_mapping_hits(self, mapping_ids):
+        """Count query-PDF cache hits in memory until the next flush"""
+        hits = DatabaseManager._mapping_hits
+        with DatabaseManager._mapping_hits_lock:
+            for mapping_id in mapping_ids:
+                hits['counts'][mapping_id] = hits['counts'].get(mapping_id, 0) + 1
+                hits['total'] += 1
+    
+    def _flush_mapping_hits(self, cursor, force=False):
+        """Write counted query-PDF cache hits back in one batch when due; returns whether it wrote"""
+        hits = DatabaseManager._mapping_hits
+        now = time.monotonic()
+        with DatabaseManager._mapping_hits_lock:
+            due = (force or hits['total'] >= QUERY_MAPPING_HIT_FLUSH_EVERY
+                   or now - hits['flushed_at'] >= QUERY_MAPPING_HIT_FLUSH_INTERVAL)
+            if not hits['counts'] or not due:
+                return False
+            counts = hits['counts']
+            hits.update(counts={}, total=0, flushed_at=now)
+        cursor.executemany('''
+            UPDATE query_pdf_mapping SET hits = hits + ?, last_used = CURRENT_TIMESTAMP WHERE id = ?
+        ''', [(count, mapping_id) for mapping_id, count in counts.items()])
+        return True
+    
+    def _record_query_pdf_results(self, cursor, query_key, results):
+        """Remember content-search results for a query and keep the cache bounded"""
+        # Eviction ranks by hits, so write back the counted ones first
+        self._flush_mapping_hits(cursor, force=True)
+        rows = [(query_key, row[0], row[-1]) for row in results] or [(query_key, None, 0)]
+        cursor.executemany('''
+            INSERT OR REPLACE INTO query_pdf_mapping (query_text, pdf_id, relevance_score, last_used)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', rows)
+        
+        # Evict the learned entries with the lowest decayed hit rate
+        cursor.execute('SELECT COUNT(*) FROM query_pdf_mapping')
+        overflow = cursor.fetchone()[0] - QUERY_MAPPING_MAX_ROWS
+        if overflow > 0:
+            cursor.execute('''
+                DELETE FROM query_pdf_mapping WHERE id IN (
+                    SELECT id FROM query_pdf_mapping WHERE pinned = 0
+                    ORDER BY (hits + 1) / (1 + julianday('now') - julianday(IFNULL(last_used, created_at))) ASC
+                    LIMIT ?
+                )
+            ''', (overflow,))
     
     def get_relevant_pdfs(self, query, limit=5):
         """Get relevant PDFs for a query"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            query_key = normalize_text(query)
             
-            # First check exact query matches
+            # First check the learned/pinned query cache
             cursor.execute('''
-                SELECT DISTINCT p.*, q.relevance_score
-                FROM pdf_uploads p
-                JOIN query_pdf_mapping q ON p.id = q.pdf_id
-                WHERE q.query_text LIKE ? AND p.status = 'active'
-                ORDER BY q.relevance_score DESC, q.created_at DESC
-                LIMIT ?
-            ''', (f'%{query}%', limit))
-            
-            exact_matches = cursor.fetchall()
+                SELECT id, pdf_id FROM query_pdf_mapping
+                WHERE query_text = ?
+                AND (pinned = 1 OR julianday('now') - julianday(IFNULL(last_used, created_at)) < ?)
+            ''', (query_key, QUERY_MAPPING_TTL_DAYS))
+            cached = cursor.fetchall()
+            CACHE_REQUESTS.inc(cache='query_pdf', result='hit' if cached else 'miss')
             
-            # If no exact matches, search in content
-            if not exact_matches:
+            if cached:
+                self._count_mapping_hits(row[0] for row in cached)
+                if self._flush_mapping_hits(cursor):
+                    conn.commit()
+                
+                cursor.execute('''
+                    SELECT p.*, q.relevance_score
+                    FROM query_pdf_mapping q
+                    JOIN pdf_uploads p ON p.id = q.pdf_id
+                    WHERE q.query_text = ? AND p.status = 'active'
+                    ORDER BY q.pinned DESC, q.relevance_score DESC, q.hits DESC
+                    LIMIT ?
+                ''', (query_key, limit))
+                exact_matches = cursor.fetchall()
+            else:
+                # Cache miss: search in content for the normalized query and remember the outcome
+                pattern = f'%{query_key}%'
                 cursor.execute('''
                     SELECT DISTINCT p.*, 0.5 as relevance_score
                     FROM pdf_uploads p
@@ -581,9 +1760,12 @@ class DatabaseManager:
                     AND p.status = 'active'
                     ORDER BY relevance_score DESC, p.upload_date DESC
                     LIMIT ?
-                ''', (f'%{query}%', f'%{query}%', f'%{query}%', f'%{query}%', limit))
+                ''', (pattern, pattern, pattern, pattern, limit))
                 
-                exact_matches = cursor.fetchall()
+                exact_matches = cursor.fetchall() if query_key else []
+                if query_key:
+                    self._record_query_pdf_results(cursor, query_key, exact_matches)
+                    conn.commit()
             
             conn.close()
             return exact_matches
@@ -591,28 +1773,197 @@ class DatabaseManager:
             logger.error(f"Error getting relevant PDFs: {e}")
             return []
     
-    def delete_pdf(self, pdf_id):
-        """Delete PDF and its content"""
+    def get_query_pdf_mappings(self, pinned_only=False, limit=100):
+        """Get cached query-PDF mappings, most used first"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            if self._flush_mapping_hits(cursor, force=True):
+                conn.commit()
+            cursor.execute('''
+                SELECT q.id, q.query_text, q.pdf_id, p.original_filename, q.relevance_score,
+                       q.hits, q.pinned, q.last_used
+                FROM query_pdf_mapping q
+                LEFT JOIN pdf_uploads p ON p.id = q.pdf_id
+                WHERE q.pinned >= ?
+                ORDER BY q.pinned DESC, q.hits DESC, q.last_used DESC
+                LIMIT ?
+            ''', (int(pinned_only), limit))
+            mappings = cursor.fetchall()
+            conn.close()
             
-            # Delete PDF content
-            cursor.execute('DELETE FROM pdf_content WHERE pdf_id = ?', (pdf_id,))
-            
-            # Delete query mappings
-            cursor.execute('DELETE FROM query_pdf_mapping WHERE pdf_id = ?', (pdf_id,))
-            
-            # Delete PDF upload record
-            cursor.execute('DELETE FROM pdf_uploads WHERE id = ?', (pdf_id,))
-            
+            return [{
+                'id': row[0],
+                'query': row[1],
+                'pdf_id': row[2],
+                'pdf_name': row[3],
+                'relevance_score': row[4],
+                'hits': row[5],
+                'pinned': bool(row[6]),
+                'last_used': row[7]
+            } for row in mappings]
+        except Exception as e:
+            logger.error(f"Error getting query-PDF mappings: {e}")
+            return []
+    
+    def delete_query_pdf_mapping(self, mapping_id):
+        """Delete a single query-PDF mapping"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM query_pdf_mapping WHERE id = ?', (mapping_id,))
             conn.commit()
             conn.close()
             return True
         except Exception as e:
-            logger.error(f"Error deleting PDF: {e}")
+            logger.error(f"Error deleting query-PDF mapping: {e}")
             return False
     
+    def clear_learned_query_mappings(self):
+        """Forget learned (non-pinned) mappings, e.g. after PDF content changed"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM query_pdf_mapping WHERE pinned = 0')
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing query-PDF mappings: {e}")
+            return False
+    
+    def get_pdf_by_id(self, pdf_id):
+        """Get a single PDF upload by ID"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM pdf_uploads WHERE id = ?', (pdf_id,))
+            pdf = cursor.fetchone()
+            conn.close()
+            return pdf
+        except Exception as e:
+            logger.error(f"Error getting PDF by ID: {e}")
+            return None
+    
+    def get_pdfs_by_ids(self, pdf_ids):
+        """Get several PDF uploads by ID"""
+        if not pdf_ids:
+            return []
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT * FROM pdf_uploads WHERE id IN ({','.join('?' * len(pdf_ids))})
+            ''', list(pdf_ids))
+            pdfs = cursor.fetchall()
+            conn.close()
+            return pdfs
+        except Exception as e:
+            logger.error(f"Error getting PDFs by ID: {e}")
+            return []
+    
+    def delete_pdf(self, pdf_id):
+        """Delete PDF and its content"""
+        return self.delete_pdfs([pdf_id]) == 1
+    
+    def delete_pdfs(self, pdf_ids, batch_size=2000):
+        """Delete PDFs with their content, chunks and query mappings.
+
+        The uploads are hidden first, then their pages and chunks are removed
+        in small transactions so one large PDF doesn't hold the write lock for
+        long; deleting the upload row cascades to whatever is left. Returns the
+        number of uploads deleted.
+        """
+        if not pdf_ids:
+            return 0
+        try:
+            conn = self.get_connection()
+            try:
+                conn.execute('PRAGMA foreign_keys = ON')
+                cursor = conn.cursor()
+                placeholders = ','.join('?' * len(pdf_ids))
+                
+                # Hide from search straight away; finish_pdf_deletions completes an interrupted delete
+                cursor.execute(f"UPDATE pdf_uploads SET status = 'deleting' WHERE id IN ({placeholders})", list(pdf_ids))
+                conn.commit()
+                
+                for table in ('pdf_chunks', 'pdf_content'):
+                    while True:
+                        cursor.execute(f'''
+                            DELETE FROM {table} WHERE id IN (
+                                SELECT id FROM {table} WHERE pdf_id IN ({placeholders}) LIMIT ?
+                            )
+                        ''', (*pdf_ids, batch_size))
+                        deleted = cursor.rowcount
+                        conn.commit()
+                        if deleted < batch_size:
+                            break
+                
+                cursor.execute(f'DELETE FROM pdf_uploads WHERE id IN ({placeholders})', list(pdf_ids))
+                deleted = cursor.rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting PDF: {e}")
+            return 0
+    
+    def finish_pdf_deletions(self, upload_folder=UPLOAD_FOLDER):
+        """Complete deletes that were interrupted and left uploads in status 'deleting', files included"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, filename FROM pdf_uploads WHERE status = 'deleting'")
+            pending = cursor.fetchall()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error finding interrupted PDF deletes: {e}")
+            return 0
+        if not pending:
+            return 0
+        
+        logger.info(f"Finishing interrupted delete of {len(pending)} PDFs")
+        deleted = self.delete_pdfs([pdf_id for pdf_id, _ in pending])
+        if deleted:
+            for _, filename in pending:
+                filepath = os.path.join(upload_folder, filename)
+                # Files are stored by content hash; keep one a newer upload still uses
+                if os.path.exists(filepath) and not self._pdf_file_in_use(filename):
+                    os.remove(filepath)
+        return deleted
+    
+    def _pdf_file_in_use(self, filename):
+        """Whether any upload row still references a stored file"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM pdf_uploads WHERE filename = ? LIMIT 1', (filename,))
+            in_use = cursor.fetchone() is not None
+            conn.close()
+            return in_use
+        except Exception as e:
+            logger.error(f"Error checking PDF file use: {e}")
+            return True
+    
+    def set_pdfs_status(self, pdf_ids, status):
+        """Archive or restore PDFs; non-active PDFs are left out of search"""
+        if not pdf_ids:
+            return 0
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                UPDATE pdf_uploads SET status = ? WHERE id IN ({','.join('?' * len(pdf_ids))})
+            ''', (status, *pdf_ids))
+            updated = cursor.rowcount
+            conn.commit()
+            conn.close()
+            return updated
+        except Exception as e:
+            logger.error(f"Error updating PDF status: {e}")
+            return 0
+    
     def get_all_settings(self):
         """Get all bot settings"""
         try:
@@ -638,6 +1989,7 @@ class DatabaseManager:
             ''', (value, key))
             conn.commit()
             conn.close()
+            DatabaseManager._versions['values'] = None
             return True
         except Exception as e:
             logger.error(f"Error updating setting: {e}")
@@ -656,6 +2008,87 @@ class DatabaseManager:
             logger.error(f"Error getting all settings: {e}")
             return {}
     
+    def get_admin_logs_page(self, limit=50, after=None, admin_id=None, start=None, end=None):
+        """Get one keyset page of admin logs, newest first"""
+        try:
+            conditions, params = [], []
+            if admin_id:
+                conditions.append('al.admin_id = ?')
+                params.append(admin_id)
+            
+            rows, next_key = self._keyset_page(
+                '''SELECT al.id, al.timestamp, al.action, al.details, u.username
+                   FROM admin_logs al JOIN users u ON al.admin_id = u.id''',
+                'al.timestamp', 'al.id', conditions, params, limit, after, start, end
+            )
+            return [{
+                'id': row[0],
+                'timestamp': row[1],
+                'action': row[2],
+                'details': row[3],
+                'admin_username': row[4]
+            } for row in rows], next_key
+        except Exception as e:
+            logger.error(f"Error getting admin logs page: {e}")
+            return [], None
+    
+    def get_users_page(self, limit=100, after=None, start=None, end=None):
+        """Get one keyset page of users, newest first"""
+        try:
+            rows, next_key = self._keyset_page(
+                'SELECT id, created_at, username, email, role, last_login FROM users',
+                'created_at', 'id', [], [], limit, after, start, end
+            )
+            return [{
+                'id': row[0],
+                'created_at': row[1],
+                'username': row[2],
+                'email': row[3],
+                'role': row[4],
+                'last_login': row[5]
+            } for row in rows], next_key
+        except Exception as e:
+            logger.error(f"Error getting users page: {e}")
+            return [], None
+    
+    # Dashboard statistics
+    def get_stats(self):
+        """Get dashboard totals from the cached counters"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT name, value FROM stats_counters')
+            stats = {name: value for name, value in cursor.fetchall()}
+            cursor.execute('SELECT MAX(updated_at) FROM scraped_data')
+            stats['data_last_updated'] = cursor.fetchone()[0]
+            conn.close()
+            
+            for name in ('total_users', 'total_chats', 'total_pdfs'):
+                stats.setdefault(name, 0)
+            return stats
+        except Exception as e:
+            logger.error(f"Error getting stats: {e}")
+            return {'total_users': 0, 'total_chats': 0, 'total_pdfs': 0, 'data_last_updated': None}
+    
+    def recount_stats(self):
+        """Recompute the cached counters with full COUNT(*) queries"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO stats_counters (name, value)
+                SELECT 'total_users', COUNT(*) FROM users
+                UNION ALL SELECT 'total_chats', (SELECT COUNT(*) FROM chat_history)
+                    + (SELECT IFNULL(SUM(row_count), 0) FROM chat_archives)
+                UNION ALL SELECT 'total_pdfs', COUNT(*) FROM pdf_uploads WHERE status = 'active'
+            ''')
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error recounting stats: {e}")
+            return False
+    
     # Admin logs
     def log_admin_action(self, admin_id, action, details=None):
         """Log admin action"""
@@ -702,3 +2135,7 @@ class DatabaseManager:
 
 # Initialize database
 db = DatabaseManager()
+
+if __name__ == '__main__':
+    # Periodic maintenance entry point, e.g. from cron: python database.py
+    print(db.run_chat_maintenance())
@@ -0,0 +1,20 @@
+import multiprocessing
+import os
+
+# Gunicorn settings for wsgi:application, overridable via environment
+bind = os.environ.get('VBSPU_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('VBSPU_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('VBSPU_THREADS', 4))
+worker_class = 'gthread'
+
+# Import the app (and its read-only data) once in the master before forking
+preload_app = True
+
+# PDF extraction may take up to a minute per upload
+timeout = int(os.environ.get('VBSPU_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('VBSPU_LOG_LEVEL', 'info')
@@ -0,0 +1,103 @@
+import gzip
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+from metrics import CACHE_REQUESTS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+# Max serialized representations kept in memory
+MAX_CACHED_BODIES = 64
+
+_bodies = OrderedDict()
+_bodies_lock = threading.Lock()
+
+def _pick_encoding():
+    """Choose the best encoding the client accepts"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] > 0:
+        return 'br'
+    if accepted['gzip'] > 0:
+        return 'gzip'
+    return 'identity'
+
+def _encode(body, encoding):
+    if len(body) < MIN_COMPRESS_SIZE or encoding == 'identity':
+        return body, 'identity'
+    if encoding == 'br':
+        return brotli.compress(body, quality=5), 'br'
+    return gzip.compress(body, compresslevel=6), 'gzip'
+
+def _cache_get(key):
+    with _bodies_lock:
+        entry = _bodies.get(key)
+        if entry is not None:
+            _bodies.move_to_end(key)
+        return entry
+
+def _cache_put(key, entry):
+    with _bodies_lock:
+        _bodies[key] = entry
+        _bodies.move_to_end(key)
+        while len(_bodies) > MAX_CACHED_BODIES:
+            _bodies.popitem(last=False)
+
+def _etag(version, name, encoding):
+    tag = f"{version}-{name}"
+    return tag if encoding == 'identity' else f"{tag}-{encoding}"
+
+def cached_json_response(version, name, build_payload):
+    """Serve a read-only JSON payload with a strong ETag and compression.
+
+    version is the current data version and name identifies the resource;
+    together they form the ETag, so a matching If-None-Match is answered
+    with 304 before build_payload is called. build_payload returns
+    (payload, status); only 200 responses are cached. Serialized and
+    compressed bodies are kept in memory per representation.
+    """
+    encoding = _pick_encoding()
+
+    # The representation actually sent may be uncompressed (small body),
+    # so both possible tags are checked against the client's validators
+    for candidate in {encoding, 'identity'}:
+        etag = _etag(version, name, candidate)
+        if request.if_none_match.contains(etag):
+            CACHE_REQUESTS.inc(cache='http_body', result='not_modified')
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
+
+    cache_key = (version, name, encoding)
+    entry = _cache_get(cache_key)
+    CACHE_REQUESTS.inc(cache='http_body', result='hit' if entry else 'miss')
+    if entry is None:
+        payload, status = build_payload()
+        body = json.dumps(payload).encode('utf-8')
+        if status != 200:
+            return Response(body, status=status, mimetype='application/json')
+        body, used_encoding = _encode(body, encoding)
+        entry = (body, used_encoding)
+        _cache_put(cache_key, entry)
+
+    body, used_encoding = entry
+    response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(_etag(version, name, used_encoding))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    if used_encoding != 'identity':
+        response.headers['Content-Encoding'] = used_encoding
+    return response
@@ -0,0 +1,367 @@
+"""Load generator for the VBSPU Bot.
+
+Replays a Hinglish query corpus against /user/chat, the quick-info API and
+the admin APIs, either in-process through the Flask test client or against
+a running server, and reports latency percentiles, throughput and error
+rates. A run can be saved as a JSON baseline and later runs compared to it.
+
+    python loadtest.py --in-process --requests 1000 --concurrency 20
+    python loadtest.py --url http://localhost:5000 --corpus chat_history
+    python loadtest.py --in-process --save-baseline baseline.json
+    python loadtest.py --in-process --baseline baseline.json
+
+A load generator sends far faster than a person types, so in-process runs
+lift the per-session and per-IP rate limits unless --keep-rate-limits is
+given (the chat concurrency limit always applies). A local server keeps its
+limits; start it with high VBSPU_SESSION_*/VBSPU_IP_* values to measure the
+app rather than the rate limiter. Requests answered 429 are reported
+separately from errors.
+
+In-process runs work on a throwaway copy of the database (--db, default
+vbspu_bot.db), so the chats, counters and caches they write never reach it.
+"""
+import argparse
+import atexit
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Synthetic Hinglish/English queries covering every intent
+SYNTHETIC_CORPUS = [
+    'admission kab se start hoga',
+    'B.Sc admission ki last date kya hai',
+    'MBA me admission ke liye entrance exam hai kya',
+    'apply kaise karein samarth portal par',
+    'BCA course ki fees kitni hai',
+    'B.Ed ki fees batao',
+    'scholarship ke liye apply kaise kare',
+    'hostel fees kitni hai',
+    'exam date kya hai',
+    'BA 3rd semester ka result kab aayega',
+    'admit card kab milega',
+    'exam schedule batao please',
+    'M.Sc chemistry course available hai kya',
+    'kaun kaun se departments hain',
+    'PhD program ke bare me batao',
+    'B.Tech course duration kitna hai',
+    'latest news batao',
+    'koi naya notice aaya hai kya',
+    'university announcement kya hai',
+    'contact number kya hai',
+    'university ka address batao',
+    'email id kya hai admission office ki',
+    'hello',
+    'namaste',
+    'aap kya kar sakte ho',
+    'library timing kya hai',
+    'weather kaisa hai aaj',
+    'fake marksheet kaise banaye',
+    'result update kab hoga',
+    'BCA fees aur scholarship dono batao'
+]
+
+# GET endpoints hit by the 'admin' target, in rotation
+ADMIN_ENDPOINTS = [
+    '/admin/api/dashboard',
+    '/admin/api/analytics?days=7',
+    '/admin/api/chat-history?limit=50',
+    '/admin/api/logs?limit=50',
+    '/admin/api/users?limit=50',
+    '/admin/api/top-queries?limit=20'
+]
+
+DEFAULT_MIX = 'chat=8,quick-info=1,admin=1'
+
+# Relative slowdown (and absolute error-rate increase) tolerated against a baseline
+DEFAULT_TOLERANCE = 0.2
+ERROR_RATE_TOLERANCE = 0.01
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, math.ceil(pct * len(values) / 100) - 1))
+    return values[index]
+
+def load_corpus(source, size, db_name):
+    """Queries from 'synthetic', 'chat_history' or a text file with one query per line"""
+    if source == 'synthetic':
+        return list(SYNTHETIC_CORPUS)
+    if source == 'chat_history':
+        from database import DatabaseManager
+        queries = DatabaseManager(db_name).sample_chat_messages(size)
+        if not queries:
+            print('chat_history is empty, using the synthetic corpus', file=sys.stderr)
+            return list(SYNTHETIC_CORPUS)
+        return queries
+    with open(source, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def parse_mix(mix):
+    """Parse 'chat=8,quick-info=1,admin=1' into target weights"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ('chat', 'quick-info', 'admin'):
+            raise ValueError(f'Unknown target: {name}')
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def build_schedule(total, weights, corpus, seed):
+    """Deterministic list of (target, method, path, json_body) requests"""
+    rng = random.Random(seed)
+    names = list(weights)
+    schedule = []
+    for i in range(total):
+        target = rng.choices(names, weights=[weights[name] for name in names])[0]
+        if target == 'chat':
+            schedule.append((target, 'POST', '/user/chat', {'message': rng.choice(corpus)}))
+        elif target == 'quick-info':
+            schedule.append((target, 'GET', '/user/api/quick-info', None))
+        else:
+            schedule.append((target, 'GET', ADMIN_ENDPOINTS[i % len(ADMIN_ENDPOINTS)], None))
+    return schedule
+
+class TestClientFactory:
+    """Flask test clients, one per load-generating thread, each with its own IP.
+
+    The app runs in a temporary directory on a copy of db_name; every module
+    opens vbspu_bot.db relative to the working directory, so all of them use
+    the copy, which is removed at exit.
+    """
+
+    def __init__(self, admin, keep_rate_limits=False, db_name='vbspu_bot.db'):
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        self.workdir = tempfile.mkdtemp(prefix='vbspu-loadtest-')
+        # Registered before the app is imported, so it runs after the app's own exit hooks
+        atexit.register(shutil.rmtree, self.workdir, True)
+        self.db_name = os.path.join(self.workdir, 'vbspu_bot.db')
+        if os.path.exists(db_name):
+            source = sqlite3.connect(db_name)
+            copy = sqlite3.connect(self.db_name)
+            source.backup(copy)
+            copy.close()
+            source.close()
+        os.chdir(self.workdir)
+
+        from app import create_app
+        import rate_limit
+        self.app = create_app()
+        if not keep_rate_limits:
+            for limiter in (rate_limit.session_limiter, rate_limit.ip_limiter):
+                limiter.rate = limiter.burst = 1e9
+        self.admin = admin
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.count += 1
+            number = self.count
+        client = self.app.test_client()
+        client.environ_base['REMOTE_ADDR'] = f'10.{number // 65536 % 256}.{number // 256 % 256}.{number % 256}'
+        if self.admin:
+            with client.session_transaction() as session:
+                session['admin_id'] = 1
+
+        def send(method, path, body):
+            return client.open(path, method=method, json=body).status_code
+        return send
+
+class HttpClientFactory:
+    """requests sessions against a running server, logged in as admin if needed"""
+
+    def __init__(self, base_url, admin, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.admin = admin
+        self.credentials = {'username': username, 'password': password}
+
+    def __call__(self):
+        import requests
+        session = requests.Session()
+        if self.admin:
+            session.post(f'{self.base_url}/admin/login', data=self.credentials, timeout=30)
+
+        def send(method, path, body):
+            return session.request(method, f'{self.base_url}{path}', json=body, timeout=60).status_code
+        return send
+
+def summarize(latencies, errors, rate_limited, duration=None):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors + rate_limited
+    summary = {
+        'requests': total,
+        'errors': errors,
+        'rate_limited': rate_limited,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'mean_ms': round(statistics.mean(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0
+    }
+    if duration:
+        summary['req_per_sec'] = round(total / duration, 1)
+    return summary
+
+def run(client_factory, schedule, concurrency, warmup=0):
+    """Send the schedule from `concurrency` threads and summarize latencies per target"""
+    local = threading.local()
+    results = {}
+    lock = threading.Lock()
+
+    def one_request(item, record=True):
+        target, method, path, body = item
+        if not hasattr(local, 'send'):
+            local.send = client_factory()
+        started = time.perf_counter()
+        try:
+            status = local.send(method, path, body)
+        except Exception:
+            status = None
+        elapsed = (time.perf_counter() - started) * 1000
+        if not record:
+            return
+        with lock:
+            latencies, counts = results.setdefault(target, ([], {'errors': 0, 'rate_limited': 0}))
+            if status == 429:
+                counts['rate_limited'] += 1
+            elif status is None or status >= 400:
+                counts['errors'] += 1
+            else:
+                latencies.append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda item: one_request(item, record=False), schedule[:warmup]))
+        started = time.perf_counter()
+        list(pool.map(one_request, schedule))
+        duration = time.perf_counter() - started
+
+    all_latencies = [latency for latencies, _ in results.values() for latency in latencies]
+    report = {
+        'overall': summarize(all_latencies,
+                             sum(counts['errors'] for _, counts in results.values()),
+                             sum(counts['rate_limited'] for _, counts in results.values()),
+                             duration),
+        'targets': {}
+    }
+    report['overall']['seconds'] = round(duration, 2)
+    for target, (latencies, counts) in sorted(results.items()):
+        report['targets'][target] = summarize(latencies, counts['errors'], counts['rate_limited'])
+    return report
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare a report with a baseline; returns (rows, regressions)"""
+    rows, regressions = [], []
+    sections = [('overall', report['overall'], baseline.get('overall', {}))]
+    sections += [(target, stats, baseline.get('targets', {}).get(target, {}))
+                 for target, stats in report['targets'].items()]
+
+    for name, current, previous in sections:
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'req_per_sec', 'error_rate'):
+            if metric not in current or metric not in previous:
+                continue
+            old, new = previous[metric], current[metric]
+            change = (new - old) / old if old else 0.0
+            if metric == 'req_per_sec':
+                regressed = new < old * (1 - tolerance)
+            elif metric == 'error_rate':
+                regressed = new > old + ERROR_RATE_TOLERANCE
+            else:
+                regressed = new > old * (1 + tolerance)
+            rows.append((name, metric, old, new, change, regressed))
+            if regressed:
+                regressions.append(f'{name} {metric}: {old} -> {new}')
+    return rows, regressions
+
+def print_report(report):
+    header = f"{'target':<12}{'requests':>9}{'errors':>8}{'429':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}"
+    print(header)
+    print('-' * len(header))
+    for name, stats in [('overall', report['overall'])] + list(report['targets'].items()):
+        print(f"{name:<12}{stats['requests']:>9}{stats['errors']:>8}{stats['rate_limited']:>6}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats.get('req_per_sec', ''):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the VBSPU Bot')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--url', help='Base URL of a running server')
+    mode.add_argument('--in-process', action='store_true', help='Use the Flask test client (default)')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=20, help='Unrecorded requests sent first')
+    parser.add_argument('--corpus', default='synthetic', help="'synthetic', 'chat_history' or a file path")
+    parser.add_argument('--corpus-size', type=int, default=200, help='Queries sampled from chat_history')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Target weights, e.g. chat=8,quick-info=1,admin=1')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', default='vbspu_bot.db',
+                        help='Database copied for in-process runs and sampled by --corpus chat_history')
+    parser.add_argument('--keep-rate-limits', action='store_true',
+                        help='Keep per-session/IP rate limits in in-process runs')
+    parser.add_argument('--admin-user', default='admin')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Write the report as a JSON baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed relative slowdown before a metric counts as a regression')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    if args.url:
+        factory = HttpClientFactory(args.url, 'admin' in weights, args.admin_user, args.admin_password)
+        db_name = args.db
+    else:
+        # First, so the app modules open the copy when they are imported
+        factory = TestClientFactory('admin' in weights, args.keep_rate_limits, args.db)
+        db_name = factory.db_name
+    corpus = load_corpus(args.corpus, args.corpus_size, db_name)
+    schedule = build_schedule(args.requests, weights, corpus, args.seed)
+
+    report = run(factory, schedule, args.concurrency, args.warmup)
+    report['config'] = {
+        'mode': args.url or 'in-process',
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'corpus': args.corpus,
+        'corpus_size': len(corpus),
+        'mix': weights,
+        'rate_limits': bool(args.url or args.keep_rate_limits),
+        'seed': args.seed,
+        'recorded_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline saved to {args.save_baseline}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare(report, baseline, args.tolerance)
+        print(f"\nCompared with {args.baseline} ({baseline.get('config', {}).get('recorded_at', 'unknown')}):")
+        for name, metric, old, new, change, regressed in rows:
+            print(f"{name:<12}{metric:<12}{old:>10}{new:>10}{change:>+9.1%}{'  REGRESSION' if regressed else ''}")
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} tolerance')
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+# Default histogram buckets in seconds, from cache hits to slow scrapes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Buckets for per-request DB query counts
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_request = threading.local()
+_request_ids = itertools.count(1)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                # Per-bucket counts (plus +Inf), sum
+                series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            index = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    index = i
+                    break
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", le)])} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}'
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+# Request and chat pipeline timings
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    'vbspu_http_request_seconds', 'HTTP request latency by endpoint', ('endpoint', 'method', 'status')))
+CHAT_STAGE_SECONDS = registry.register(Histogram(
+    'vbspu_chat_stage_seconds', 'Time spent in each stage of answering a chat message', ('stage',)))
+DB_QUERIES_PER_REQUEST = registry.register(Histogram(
+    'vbspu_db_queries_per_request', 'SQL statements executed per HTTP request', ('endpoint',), QUERY_COUNT_BUCKETS))
+
+# Cache effectiveness
+CACHE_REQUESTS = registry.register(Counter(
+    'vbspu_cache_requests_total', 'Cache lookups by cache and result', ('cache', 'result')))
+
+# Scraper
+SCRAPE_PHASE_SECONDS = registry.register(Histogram(
+    'vbspu_scrape_phase_seconds', 'Time spent in each scraper phase', ('phase',)))
+SCRAPE_OUTCOMES = registry.register(Counter(
+    'vbspu_scrape_outcomes_total', 'Scraper page fetches, PDF extractions and full runs by outcome', ('step', 'outcome')))
+
+def begin_request():
+    """Start counting DB queries for the current request thread"""
+    _request.db_queries = 0
+    _request.id = next(_request_ids)
+
+def end_request():
+    """Stop counting and return the number of DB queries of the request"""
+    count = getattr(_request, 'db_queries', 0)
+    _request.db_queries = None
+    _request.id = None
+    return count
+
+def current_request_id():
+    """Serial number of the request handled by this thread, None outside requests"""
+    return getattr(_request, 'id', None)
+
+def count_db_query(statement=None):
+    """sqlite3 trace callback: count a statement against the current request"""
+    if getattr(_request, 'db_queries', None) is not None:
+        _request.db_queries += 1
+
+def init_app(app):
+    """Time every request and count its DB queries"""
+    from flask import request
+
+    @app.before_request
+    def start_request_metrics():
+        request.metrics_started = time.perf_counter()
+        begin_request()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = getattr(request, 'metrics_started', None)
+        if started is not None:
+            endpoint = request.endpoint or 'unknown'
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                                         method=request.method, status=response.status_code)
+            DB_QUERIES_PER_REQUEST.observe(end_request(), endpoint=endpoint)
+        return response
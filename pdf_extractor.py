@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Limits for a single extraction worker
+DOCUMENT_TIMEOUT = 60   # seconds for the whole document
+PAGE_TIMEOUT = 10       # seconds for one page
+MAX_RSS_MB = 512        # memory cap for the worker process
+
+def _limit_memory(max_rss_mb):
+    """Cap the address space of the worker (POSIX only)"""
+    try:
+        import resource
+        limit = max_rss_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def extract_pdf_pages(source, timeout=DOCUMENT_TIMEOUT, page_timeout=PAGE_TIMEOUT, max_rss_mb=MAX_RSS_MB):
+    """Extract page texts from a PDF in a separate, time and memory limited process.
+
+    source is a file path or the PDF bytes. Returns a dict with the extracted
+    'pages' as (page_number, text) tuples, 'failed_pages' as (page_number,
+    reason) tuples, the 'page_count' and an 'error' for the whole document
+    (None when the worker finished normally). Pages extracted before a
+    timeout or crash are kept.
+    """
+    result = {'pages': [], 'failed_pages': [], 'page_count': 0, 'error': None}
+
+    if isinstance(source, (bytes, bytearray)):
+        args, stdin_data = ['-'], bytes(source)
+    else:
+        args, stdin_data = [str(source)], None
+
+    # The worker caps its own memory; preexec_fn is not safe in a threaded server
+    command = [sys.executable, '-m', 'pdf_extractor', *args, str(page_timeout), str(max_rss_mb)]
+
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+    except OSError as e:
+        logger.error(f"Error starting PDF extraction worker: {e}")
+        result['error'] = 'worker_failed'
+        return result
+
+    try:
+        output, _ = process.communicate(input=stdin_data, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        output, _ = process.communicate()
+        result['error'] = 'timeout'
+
+    for line in output.decode('utf-8', errors='replace').splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if 'page_count' in record:
+            result['page_count'] = record['page_count']
+        elif 'error' in record and 'page' in record:
+            result['failed_pages'].append((record['page'], record['error']))
+        elif 'error' in record:
+            result['error'] = record['error']
+        elif 'page' in record:
+            result['pages'].append((record['page'], record['text']))
+
+    if result['error'] is None and process.returncode != 0:
+        # Killed by the memory cap or crashed mid-document
+        result['error'] = 'worker_failed'
+
+    # Pages the worker never reached count as failed
+    done = {page for page, _ in result['pages']} | {page for page, _ in result['failed_pages']}
+    for page in range(1, result['page_count'] + 1):
+        if page not in done:
+            result['failed_pages'].append((page, result['error'] or 'not_extracted'))
+
+    if result['error'] or result['failed_pages']:
+        logger.warning(f"PDF extraction incomplete: {len(result['pages'])}/{result['page_count']} pages, "
+                       f"error={result['error']}, failed={len(result['failed_pages'])}")
+    return result
+
+def _emit(record):
+    sys.stdout.write(json.dumps(record) + '\n')
+    sys.stdout.flush()
+
+def _worker(path, page_timeout, max_rss_mb):
+    """Worker entry point: stream one JSON line per page to stdout"""
+    _limit_memory(max_rss_mb)
+
+    import io
+    import signal
+    import PyPDF2
+
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    class PageTimeout(Exception):
+        pass
+
+    def on_alarm(signum, frame):
+        raise PageTimeout()
+
+    has_alarm = hasattr(signal, 'setitimer')
+    if has_alarm:
+        signal.signal(signal.SIGALRM, on_alarm)
+
+    try:
+        if path == '-':
+            reader = PyPDF2.PdfReader(io.BytesIO(sys.stdin.buffer.read()))
+        else:
+            reader = PyPDF2.PdfReader(path)
+        page_count = len(reader.pages)
+    except Exception as e:
+        _emit({'error': f'unreadable: {e}'})
+        return 1
+
+    _emit({'page_count': page_count})
+
+    for page_num in range(page_count):
+        try:
+            if has_alarm:
+                signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            text = reader.pages[page_num].extract_text() or ''
+            _emit({'page': page_num + 1, 'text': text})
+        except PageTimeout:
+            _emit({'page': page_num + 1, 'error': 'timeout'})
+        except MemoryError:
+            _emit({'page': page_num + 1, 'error': 'memory'})
+        except Exception as e:
+            _emit({'page': page_num + 1, 'error': str(e) or type(e).__name__})
+        finally:
+            if has_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+
+        # ru_maxrss is reported in KB on Linux
+        if resource and resource.getrusage(resource.RUSAGE_SELF).ru_maxrss > max_rss_mb * 1024:
+            _emit({'error': 'memory'})
+            return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_worker(sys.argv[1], float(sys.argv[2]), int(sys.argv[3])))
@@ -0,0 +1,104 @@
+import atexit
+import logging
+import threading
+import time
+
+from bot_pipeline import ChatPipeline
+from database import DatabaseManager
+from text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Distinct queries the shared counters keep
+TRACKER_CAPACITY = 200
+
+# Recorded queries, or seconds, between writes of a process's increments to the database
+PERSIST_EVERY = 100
+PERSIST_INTERVAL = 60
+
+# Longer messages are not worth tracking as repeated questions
+MAX_QUERY_LENGTH = 200
+
+# Top queries answered through the chat pipeline when warming its caches
+PREWARM_COUNT = 20
+
+class QueryTracker:
+    """Top user queries on the chat path, counted across worker processes.
+
+    Each process buffers only its own increments and adds them to the
+    shared top_queries counters (Space-Saving, see
+    DatabaseManager.add_top_queries), so workers never overwrite each
+    other. Top queries are always read back from the database.
+    """
+
+    def __init__(self, db=None, capacity=TRACKER_CAPACITY):
+        self.db = db or DatabaseManager()
+        self.capacity = capacity
+        self.pending = {}
+        self.pending_total = 0
+        self.persisted_at = time.monotonic()
+        self.exit_hook = False
+        self.lock = threading.Lock()
+
+    def record(self, message):
+        """Count one occurrence of a normalized user query"""
+        query = normalize_text(message)
+        if not query or len(query) > MAX_QUERY_LENGTH:
+            return
+        with self.lock:
+            self.pending[query] = self.pending.get(query, 0) + 1
+            self.pending_total += 1
+            due = self.pending_total >= PERSIST_EVERY or time.monotonic() - self.persisted_at >= PERSIST_INTERVAL
+            # Registered by the process answering chats, never by a preloading master
+            if not self.exit_hook:
+                atexit.register(self.persist)
+                self.exit_hook = True
+        if due:
+            self.persist()
+
+    def persist(self):
+        """Add this process's increments since the last write to the shared counters"""
+        with self.lock:
+            increments = self.pending
+            self.pending, self.pending_total = {}, 0
+            self.persisted_at = time.monotonic()
+        if not increments:
+            return True
+        saved = self.db.add_top_queries(increments, self.capacity)
+        if not saved:
+            # Keep the increments for the next write
+            with self.lock:
+                for query, count in increments.items():
+                    self.pending[query] = self.pending.get(query, 0) + count
+                    self.pending_total += count
+        return saved
+
+    def top(self, n=50):
+        """Get the most frequent queries of all processes with their count bounds"""
+        self.persist()
+        return [{
+            'query': query,
+            'count': count,
+            'error': error,
+            'guaranteed_count': count - error
+        } for query, count, error in self.db.get_top_queries(n)]
+
+    def total(self):
+        """Number of queries counted by all processes"""
+        return self.db.get_top_queries_total()
+
+    def prewarm(self, n=PREWARM_COUNT):
+        """Answer the top queries once to fill the retrieval cache, templates and rendered answers"""
+        pipeline = ChatPipeline(self.db)
+        queries = [query for query, _, _ in self.db.get_top_queries(n)]
+        for query in queries:
+            pipeline.generate_response(query)
+        if queries:
+            logger.info(f"Pre-warmed chat caches with {len(queries)} top queries")
+        return len(queries)
+
+    def prewarm_async(self, n=PREWARM_COUNT):
+        """Pre-warm in a background thread so the caller isn't delayed"""
+        threading.Thread(target=self.prewarm, args=(n,), daemon=True).start()
+
+tracker = QueryTracker()
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Chat limits, overridable via environment. All limits are per process:
+# under gunicorn each worker enforces them on its own share of the traffic.
+SESSION_RATE = float(os.environ.get('VBSPU_SESSION_RATE', 0.5))     # messages/second per session
+SESSION_BURST = int(os.environ.get('VBSPU_SESSION_BURST', 10))
+IP_RATE = float(os.environ.get('VBSPU_IP_RATE', 2))                 # messages/second per client IP
+IP_BURST = int(os.environ.get('VBSPU_IP_BURST', 30))
+MAX_ACTIVE_CHATS = int(os.environ.get('VBSPU_MAX_ACTIVE_CHATS', 4))
+MAX_QUEUED_CHATS = int(os.environ.get('VBSPU_MAX_QUEUED_CHATS', 16))
+QUEUE_TIMEOUT = float(os.environ.get('VBSPU_QUEUE_TIMEOUT', 5))     # seconds a request may wait for a slot
+
+# Max keys each bucket table and the fallback cache remember
+MAX_TRACKED_KEYS = 10000
+MAX_FALLBACK_ANSWERS = 500
+
+class TokenBucketLimiter:
+    """Token bucket per key: `rate` tokens refill per second up to `burst`"""
+
+    def __init__(self, rate, burst, max_keys=MAX_TRACKED_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def allow(self, key):
+        """Take a token for key. Returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+
+            # Forget the least recently seen keys; they would be full again anyway
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+
+        retry_after = 0 if allowed else (1 - tokens) / self.rate
+        return allowed, retry_after
+
+class ConcurrencyLimiter:
+    """At most `max_active` requests at once, with a bounded wait queue"""
+
+    def __init__(self, max_active=MAX_ACTIVE_CHATS, max_queued=MAX_QUEUED_CHATS, timeout=QUEUE_TIMEOUT):
+        self.slots = threading.BoundedSemaphore(max_active)
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.queued = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if needed. False if the queue is full or the wait times out"""
+        if self.slots.acquire(blocking=False):
+            return True
+        with self.lock:
+            if self.queued >= self.max_queued:
+                return False
+            self.queued += 1
+        try:
+            return self.slots.acquire(timeout=self.timeout)
+        finally:
+            with self.lock:
+                self.queued -= 1
+
+    def release(self):
+        self.slots.release()
+
+class FallbackCache:
+    """Recent answers by query and data version, served when a request is shed"""
+
+    def __init__(self, max_entries=MAX_FALLBACK_ANSWERS):
+        self.max_entries = max_entries
+        self.answers = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            answer = self.answers.get(key)
+            if answer is not None:
+                self.answers.move_to_end(key)
+            return answer
+
+    def put(self, key, answer):
+        with self.lock:
+            self.answers[key] = answer
+            self.answers.move_to_end(key)
+            while len(self.answers) > self.max_entries:
+                self.answers.popitem(last=False)
+
+session_limiter = TokenBucketLimiter(SESSION_RATE, SESSION_BURST)
+ip_limiter = TokenBucketLimiter(IP_RATE, IP_BURST)
+chat_slots = ConcurrencyLimiter()
+fallback_answers = FallbackCache()
@@ -0,0 +1,289 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OFF_TOPIC_RESPONSE = "Main sirf VBSPU se related queries me hi madad kar sakta hoon."
+DEFAULT_WELCOME_MESSAGE = "नमस्ते! मैं VBSPU AI Assistant हूं। क्या जानना चाहते हैं आप?"
+
+# Rendered category answers kept per template version
+MAX_RENDERED_ANSWERS = 1000
+
+# Bot settings the compiled answers depend on
+TEMPLATE_SETTINGS = ('off_topic_response', 'welcome_message')
+
+ILLEGAL_RESPONSE = "Main aise illegal documents ke bare me baat nahi kar sakta. Kripya university ki official procedure follow karein."
+
+MENU_RESPONSE = """{welcome_msg}
+
+मैं आपको इन विषयों में मदद कर सकता हूं:
+
+🔹 Admissions aur courses
+🔹 Fees aur scholarships  
+🔹 Exam dates aur results
+🔹 Facilities aur campus info
+🔹 News aur notices
+
+आप क्या जानना चाहते हैं?"""
+
+ADMISSION_RESPONSE = """VBSPU me admission ke liye ye information hai:
+
+
+🔹 **Important Points**:
+• Samarth portal se online apply karein
+• 12th pass for UG, graduation for PG
+• Documents: Marksheet, ID proof, photo
+• Usually June-July me admission start hota hai
+
+Detailed info ke liye: https://www.vbspu.ac.in"""
+
+FACILITY_RESPONSE = """VBSPU campus facilities:
+
+🔹 **Library**: Central library with large collection, online journals
+🔹 **Hostels**: Boys and girls separate hostels with WiFi facility
+🔹 **Transport**: Bus facility for local students from different routes
+🔹 **Sports**: Ground for cricket, football, volleyball, indoor games
+🔹 **Computer Labs**: Modern computer labs with internet facility
+🔹 **Cafeteria**: Hygienic food facility for students
+🔹 **Medical**: Basic medical facility available on campus
+🔹 **SWAYAM**: Online courses and MOOCs available
+
+More info ke liye campus visit karein ya website check karein."""
+
+CONTACT_RESPONSE = """VBSPU Contact Information:
+
+🔹 **Address**: 
+Veer Bahadur Singh Purvanchal University,
+Jaunpur, Uttar Pradesh - 222001
+
+🔹 **Website**: https://www.vbspu.ac.in
+
+🔹 **Phone**: 
+• +91-5452-252285 (Office)
+• +91-5452-252286 (Registrar)
+
+🔹 **Email**: 
+• registrar@vbspu.ac.in
+• info@vbspu.ac.in
+
+🔹 **Social Media**:
+• Facebook: /VBSPUOfficial
+• Twitter: @VBSPU_Jaunpur
+
+Working hours: 10:00 AM - 5:00 PM (Monday to Saturday)"""
+
+# Terms in a fee question -> course key, checked in order
+FEE_COURSE_MAPPING = {
+    'ba': 'b.a', 'b.a': 'b.a', 'bachelor of arts': 'b.a',
+    'bsc': 'b.sc', 'b.sc': 'b.sc', 'bachelor of science': 'b.sc',
+    'bcom': 'b.com', 'b.com': 'b.com', 'bachelor of commerce': 'b.com',
+    'bca': 'bca', 'b.c.a': 'bca',
+    'bba': 'bba', 'b.b.a': 'bba',
+    'btech': 'b.tech', 'b.tech': 'b.tech',
+    'ma': 'm.a', 'm.a': 'm.a', 'master of arts': 'm.a',
+    'msc': 'm.sc', 'm.sc': 'm.sc', 'master of science': 'm.sc',
+    'mcom': 'm.com', 'm.com': 'm.com', 'master of commerce': 'm.com',
+    'mca': 'mca', 'm.c.a': 'mca',
+    'mba': 'mba', 'm.b.a': 'mba',
+    'mtech': 'm.tech', 'm.tech': 'm.tech'
+}
+UG_FEE_COURSES = ('b.a', 'b.sc', 'b.com', 'bca', 'bba')
+PG_FEE_COURSES = ('m.a', 'm.sc', 'm.com', 'mca', 'mba')
+
+FEE_RESPONSE_HEADER = "VBSPU fee structure:\n\n"
+EXAM_RESPONSE_HEADER = "VBSPU exam related information:\n\n"
+NEWS_RESPONSE_HEADER = "VBSPU latest updates:\n\n"
+
+def find_fee_course(query):
+    """Course key of the first course term in a fee question, None if there is none"""
+    for user_term, course_key in FEE_COURSE_MAPPING.items():
+        if user_term in query:
+            return course_key
+    return None
+
+def _link_lines(items):
+    return ''.join(f"• {item['title']}: {item['url']}\n" for item in items)
+
+def _title_lines(items, limit):
+    return ''.join(f"• {item.get('title', 'N/A')}\n" for item in items[:limit])
+
+def _compile_course_parts(courses):
+    head = "VBSPU me ye courses available hain:\n\n"
+    if courses.get('undergraduate_programs'):
+        head += "🔹 **UG Programs**:\n" + ''.join(f"• {course}\n" for course in courses['undergraduate_programs'])
+    head += "\n"
+    if courses.get('postgraduate_programs'):
+        head += "🔹 **PG Programs**:\n" + ''.join(f"• {course}\n" for course in courses['postgraduate_programs'])
+    if courses.get('departments'):
+        head += f"\n🔹 **Total Departments**: {len(courses['departments'])}\n"
+    return head, "\nFull list aur details ke liye official website check karein."
+
+def _compile_fee_course_block(fees, course_key):
+    block = f"🎓 **{course_key.upper()} Fee Information**:\n\n"
+    if fees.get('course_fees') and course_key in fees['course_fees']:
+        course_fee = fees['course_fees'][course_key]
+        block += f"🎓 **{course_fee.get('name', course_key.upper())} Fee Information**:\n\n"
+        block += f"📊 **Course Type**: {course_fee.get('type', 'N/A')}\n"
+        block += f"💰 **Fee Range**: {course_fee.get('fee_range', 'N/A')}\n"
+        block += f"⏰ **Duration**: {course_fee.get('duration', 'N/A')}\n"
+        if course_fee.get('detailed_info'):
+            details = course_fee['detailed_info']
+            block += "\n💵 **Detailed Fee Breakdown**:\n"
+            if details.get('first_year'):
+                block += f"• **1st Year**: {details['first_year']}\n"
+            if details.get('second_year'):
+                block += f"• **2nd Year**: {details['second_year']}\n"
+            if details.get('total_fee'):
+                block += f"• **Total Course Fee**: {details['total_fee']}\n"
+    elif course_key in UG_FEE_COURSES:
+        block += f"• **UG Course**: {course_key.upper()}\n"
+        block += f"• **General Fee Range**: {fees.get('undergraduate', {}).get('general', '₹10,000 - ₹50,000 per year')}\n"
+    elif course_key in PG_FEE_COURSES:
+        block += f"• **PG Course**: {course_key.upper()}\n"
+        block += f"• **General Fee Range**: {fees.get('postgraduate', {}).get('general', '₹15,000 - ₹60,000 per year')}\n"
+    return block
+
+def _compile_fee_general(fees):
+    text = "🔹 **General Fee Structure**:\n"
+    if fees.get('undergraduate'):
+        ug = fees['undergraduate']
+        text += f"• **UG Fees**: {ug.get('general', 'N/A')}\n"
+        if ug.get('professional'):
+            text += f"• **Professional UG**: {ug['professional']}\n"
+    if fees.get('postgraduate'):
+        pg = fees['postgraduate']
+        text += f"• **PG Fees**: {pg.get('general', 'N/A')}\n"
+        if pg.get('professional'):
+            text += f"• **Professional PG**: {pg['professional']}\n"
+    if fees.get('detailed_fee_structure'):
+        text += "\n🔹 **Available Fee Documents**:\n" + ''.join(f"📄 {pdf_name}\n" for pdf_name in fees['detailed_fee_structure'])
+    text += "\n💰 **For complete fee details**: https://www.vbspu.ac.in/en/article/online-fee20"
+    text += "\n📞 **Contact university office for exact amounts**"
+    return text
+
+def _compile_exam_body(exams):
+    body = ""
+    if exams.get('exam_schedule'):
+        body += "🔹 **Exam Schedule**:\n" + _title_lines(exams['exam_schedule'], 3)
+    if exams.get('results'):
+        body += "\n🔹 **Results**:\n" + _title_lines(exams['results'], 2)
+    if exams.get('admit_cards'):
+        body += "\n🔹 **Admit Cards**:\n" + _title_lines(exams['admit_cards'], 2)
+    return body + "\nSpecific dates aur links ke liye: https://www.vbspu.ac.in"
+
+def _compile_news_body(news):
+    body = ""
+    if news.get('latest_news'):
+        body += "🔹 **Latest News**:\n" + _title_lines(news['latest_news'], 5)
+    body += "\n🔹 **Official Sources**:\n"
+    body += "• University website: vbspu.ac.in\n"
+    body += "• Notice board on campus\n"
+    body += "• Student portal updates\n\n"
+    return body + "Regular updates ke liye website visit karte rahein."
+
+class ResponseTemplates:
+    """Answer fragments compiled from one version of the scraped data and bot settings.
+
+    Everything that does not depend on the question is rendered here once;
+    render() only adds the course-specific fee block and the scraped links
+    matching the question, and remembers the result for repeated questions.
+    """
+
+    def __init__(self, scraped_data, settings):
+        self.off_topic = settings.get('off_topic_response') or DEFAULT_OFF_TOPIC_RESPONSE
+        self.menu = MENU_RESPONSE.format(welcome_msg=settings.get('welcome_message') or DEFAULT_WELCOME_MESSAGE)
+
+        courses = scraped_data.get('courses') or {}
+        self.course_head, self.course_tail = _compile_course_parts(courses)
+        self.course_links = bool(courses.get('departments'))
+
+        fees = scraped_data.get('fees') or {}
+        self.fee_course_blocks = {course_key: _compile_fee_course_block(fees, course_key)
+                                  for course_key in set(FEE_COURSE_MAPPING.values())}
+        self.fee_general = _compile_fee_general(fees)
+
+        self.exam_body = _compile_exam_body(scraped_data.get('examinations') or {})
+        self.news_body = _compile_news_body(scraped_data.get('news_notices') or {})
+
+        self.rendered = OrderedDict()
+        self.rendered_lock = threading.Lock()
+
+    def fixed_answer(self, intent):
+        """Whole answer of an intent that gets no category block or PDF search, else None"""
+        return {
+            'contact': CONTACT_RESPONSE,
+            'general': self.menu
+        }.get(intent)
+
+    def render(self, intent, query, db):
+        """Category answer for an intent and lowercased question, cached while these templates are current"""
+        key = (intent, query)
+        with self.rendered_lock:
+            answer = self.rendered.get(key)
+            if answer is not None:
+                self.rendered.move_to_end(key)
+        CACHE_REQUESTS.inc(cache='rendered_answer', result='hit' if answer is not None else 'miss')
+        if answer is None:
+            answer = self._render(intent, query, db)
+            with self.rendered_lock:
+                self.rendered[key] = answer
+                while len(self.rendered) > MAX_RENDERED_ANSWERS:
+                    self.rendered.popitem(last=False)
+        return answer
+
+    def _render(self, intent, query, db):
+        if intent == 'admission':
+            return ADMISSION_RESPONSE
+
+        if intent == 'facility':
+            return FACILITY_RESPONSE
+
+        if intent == 'course':
+            links = _link_lines(db.search_scraped_items(query, ['courses'], limit=3)) if self.course_links else ''
+            return self.course_head + links + self.course_tail
+
+        if intent == 'fee':
+            course_key = find_fee_course(query)
+            course_block = self.fee_course_blocks[course_key] if course_key else ''
+            return FEE_RESPONSE_HEADER + course_block + self.fee_general
+
+        if intent == 'exam':
+            matches = db.search_scraped_items(query, ['examinations'], limit=5)
+            links = f"🔎 **Matching Links**:\n{_link_lines(matches)}\n" if matches else ''
+            return EXAM_RESPONSE_HEADER + links + self.exam_body
+
+        if intent == 'news':
+            matches = db.search_scraped_items(query, ['news_notices'], limit=5)
+            links = f"🔎 **Matching Notices**:\n{_link_lines(matches)}\n" if matches else ''
+            return NEWS_RESPONSE_HEADER + links + self.news_body
+
+        raise ValueError(f"Unknown intent: {intent}")
+
+# Compiled templates and the (data version, settings version) they were built from
+_compiled = {'version': None, 'data': None}
+_compile_lock = threading.Lock()
+
+def current_templates():
+    """Most recently compiled templates without checking versions (no database access), or None"""
+    return _compiled['data']
+
+def get_templates(db):
+    """Response templates for the current scraped data and settings, recompiled when either changes"""
+    version = (db.get_data_version(), db.get_settings_version())
+    compiled = _compiled
+    if compiled['data'] is not None and compiled['version'] == version:
+        CACHE_REQUESTS.inc(cache='response_templates', result='hit')
+        return compiled['data']
+
+    with _compile_lock:
+        if compiled['data'] is None or compiled['version'] != version:
+            CACHE_REQUESTS.inc(cache='response_templates', result='miss')
+            scraped_data = db.get_scraped_data() or {}
+            settings = {name: db.get_setting(name) for name in TEMPLATE_SETTINGS}
+            # Data first, so a reader that sees the new version also sees its templates
+            compiled['data'], compiled['version'] = ResponseTemplates(scraped_data, settings), version
+            logger.info(f"Compiled response templates for data version {version[0]}, settings version {version[1]}")
+        return compiled['data']
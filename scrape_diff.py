@@ -0,0 +1,83 @@
+import hashlib
+import json
+
+# Fields that change on every scrape and must not count as a content change
+VOLATILE_KEYS = {'last_updated', 'scraped_at'}
+
+# Max added/removed labels listed per section in a summary
+MAX_LISTED_CHANGES = 20
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+def content_hash(data):
+    """Stable SHA-256 of category data, ignoring timestamps"""
+    canonical = json.dumps(_strip_volatile(data), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _item_label(item):
+    if isinstance(item, dict):
+        label = item.get('title') or item.get('name') or item.get('event')
+        if label:
+            return f"{label} ({item['url']})" if item.get('url') else str(label)
+        return json.dumps(_strip_volatile(item), sort_keys=True, ensure_ascii=False)
+    return str(item)
+
+def section_items(data):
+    """Map each list/dict section of category data to its item labels"""
+    if not isinstance(data, dict):
+        return {}
+    sections = {}
+    for key, value in data.items():
+        if isinstance(value, list):
+            sections[key] = [_item_label(item) for item in value]
+        elif isinstance(value, dict):
+            sections[key] = [str(k) for k in value.keys()]
+    return sections
+
+def summarize_scrape(previous, current):
+    """Compact summary of a scrape compared with the previous snapshot.
+
+    For each category: item count, content hash, whether it changed and
+    the items added/removed per section (at most MAX_LISTED_CHANGES each).
+    """
+    previous = previous or {}
+    categories = {}
+
+    for category, data in current.items():
+        if not isinstance(data, dict):
+            continue
+        old_data = previous.get(category)
+        new_hash = content_hash(data)
+        old_hash = content_hash(old_data) if old_data is not None else None
+
+        new_sections = section_items(data)
+        old_sections = section_items(old_data)
+        added, removed = {}, {}
+        if new_hash != old_hash:
+            for section in set(new_sections) | set(old_sections):
+                new_items = new_sections.get(section, [])
+                old_items = set(old_sections.get(section, []))
+                section_added = [item for item in new_items if item not in old_items]
+                section_removed = [item for item in old_sections.get(section, []) if item not in set(new_items)]
+                if section_added:
+                    added[section] = {'count': len(section_added), 'items': section_added[:MAX_LISTED_CHANGES]}
+                if section_removed:
+                    removed[section] = {'count': len(section_removed), 'items': section_removed[:MAX_LISTED_CHANGES]}
+
+        categories[category] = {
+            'item_count': sum(len(items) for items in new_sections.values()),
+            'content_hash': new_hash,
+            'changed': new_hash != old_hash,
+            'added': added,
+            'removed': removed
+        }
+
+    return {
+        'categories': categories,
+        'changed_categories': [name for name, info in categories.items() if info['changed']]
+    }
@@ -2,21 +2,27 @@ import requests
 from bs4 import BeautifulSoup
 import re
 import json
+import os
 import time
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 import sqlite3
 import logging
-import PyPDF2
-import io
+from pdf_extractor import extract_pdf_pages
+from metrics import SCRAPE_PHASE_SECONDS, SCRAPE_OUTCOMES
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Live site by default; point VBSPU_BASE_URL at a mirror (e.g. benchmarks/mock_site.py) to scrape offline
+DEFAULT_BASE_URL = os.environ.get('VBSPU_BASE_URL', "https://www.vbspu.ac.in")
+
+# Article listing the fee structure PDFs, relative to the base URL
+FEE_PAGE_PATH = "/en/article/online-fee20"
+
 class VBSPUScraper:
-    def __init__(self):
-        self.base_url = "https://www.vbspu.ac.in"
+    def __init__(self, base_url=None, db_name='vbspu_bot.db'):
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip('/')
+        self.db_name = db_name
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -26,10 +32,13 @@ class VBSPUScraper:
     def get_page_content(self, url):
         """Fetch page content with error handling"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            with SCRAPE_PHASE_SECONDS.time(phase='fetch'):
+                response = self.session.get(url, timeout=10)
+                response.raise_for_status()
+            SCRAPE_OUTCOMES.inc(step='fetch', outcome='ok')
             return response.text
         except requests.RequestException as e:
+            SCRAPE_OUTCOMES.inc(step='fetch', outcome='error')
             logger.error(f"Error fetching {url}: {e}")
             return None
     
@@ -168,15 +177,19 @@ class VBSPUScraper:
             response = self.session.get(pdf_url, timeout=30)
             response.raise_for_status()
             
-            # Create PDF file object from bytes
-            pdf_file = io.BytesIO(response.content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            # Extract text in a time/memory limited worker, keeping whatever pages succeed
+            with SCRAPE_PHASE_SECONDS.time(phase='pdf_extract'):
+                extraction = extract_pdf_pages(response.content)
+            if extraction['failed_pages']:
+                logger.warning(f"Failed pages in {pdf_url}: {extraction['failed_pages']}")
+            SCRAPE_OUTCOMES.inc(step='pdf_extract', outcome='ok' if extraction['pages'] and not extraction['failed_pages']
+                                else 'partial' if extraction['pages'] else 'failed')
+            if not extraction['pages']:
+                return None
             
-            # Extract text from all pages
             text = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
+            for page_num, page_text in extraction['pages']:
+                text += page_text + "\n"
             
             return text
         except Exception as e:
@@ -333,7 +346,7 @@ class VBSPUScraper:
         }
         
         # Try to scrape the specific fee PDF
-        fee_pdf_url = "https://www.vbspu.ac.in/en/article/online-fee20"
+        fee_pdf_url = urljoin(self.base_url, FEE_PAGE_PATH)
         
         try:
             # Get the page content
@@ -432,26 +445,33 @@ class VBSPUScraper:
         """Scrape all information from VBSPU website"""
         logger.info("Starting comprehensive scraping...")
         
-        self.scraped_data = {
-            "admissions": self.scrape_admissions(),
-            "courses": self.scrape_courses(),
-            "examinations": self.scrape_exams(),
-            "fees": self.scrape_fees(),
-            "news_notices": self.scrape_news_notices(),
-            "scraped_at": datetime.now().isoformat()
-        }
+        phases = [
+            ("admissions", self.scrape_admissions),
+            ("courses", self.scrape_courses),
+            ("examinations", self.scrape_exams),
+            ("fees", self.scrape_fees),
+            ("news_notices", self.scrape_news_notices)
+        ]
+        self.scraped_data = {}
+        for category, scrape in phases:
+            with SCRAPE_PHASE_SECONDS.time(phase=category):
+                self.scraped_data[category] = scrape()
+        self.scraped_data["scraped_at"] = datetime.now().isoformat()
         
         # Save to database using proper database manager
         try:
             from database import DatabaseManager
-            db = DatabaseManager()
+            db = DatabaseManager(self.db_name)
             
-            for category, data in self.scraped_data.items():
-                if category != 'scraped_at':  # Skip metadata
-                    db.save_scraped_data(category, data)
+            with SCRAPE_PHASE_SECONDS.time(phase='save'):
+                for category, data in self.scraped_data.items():
+                    if category != 'scraped_at':  # Skip metadata
+                        db.save_scraped_data(category, data)
             
+            SCRAPE_OUTCOMES.inc(step='scrape_all', outcome='ok')
             logger.info("Data saved to database successfully")
         except Exception as e:
+            SCRAPE_OUTCOMES.inc(step='scrape_all', outcome='save_failed')
             logger.error(f"Error saving to database: {e}")
         
         return self.scraped_data
@@ -541,11 +561,10 @@ class VBSPUScraper:
         
         return relevant_info
 
-# Initialize scraper
-scraper = VBSPUScraper()
-
 if __name__ == "__main__":
     # Test the scraper
+    logging.basicConfig(level=logging.INFO)
+    scraper = VBSPUScraper()
     data = scraper.scrape_all()
     scraper.save_to_database(data)
     print("Scraping completed and data saved!")
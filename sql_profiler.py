@@ -0,0 +1,173 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from metrics import current_request_id
+
+logger = logging.getLogger(__name__)
+
+# Profiling is opt-in: set VBSPU_SQL_PROFILE=1 or enable it from the admin panel.
+# The flag and statistics are per process; under gunicorn use the variable.
+SLOW_QUERY_MS = float(os.environ.get('VBSPU_SLOW_QUERY_MS', 50))
+
+# Slow statements kept in memory for the admin view
+MAX_SLOW_QUERIES = 100
+
+# Distinct normalized statements tracked
+MAX_STATEMENTS = 1000
+
+_state = {'enabled': os.environ.get('VBSPU_SQL_PROFILE') == '1'}
+_stats = {}
+_slow_queries = deque(maxlen=MAX_SLOW_QUERIES)
+_lock = threading.Lock()
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+
+def is_enabled():
+    return _state['enabled']
+
+def set_enabled(enabled):
+    _state['enabled'] = bool(enabled)
+
+def reset():
+    """Forget all statement statistics and slow queries"""
+    with _lock:
+        _stats.clear()
+        _slow_queries.clear()
+
+def normalize_sql(sql):
+    """Collapse whitespace and IN-list placeholders so equivalent statements group together"""
+    return _PLACEHOLDER_LIST.sub('?, ...', _WHITESPACE.sub(' ', sql).strip())
+
+def _explain(connection, sql, params):
+    """EXPLAIN QUERY PLAN output of a statement, one detail line per step"""
+    try:
+        cursor = sqlite3.Cursor(connection)
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[3] for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        return [f'unavailable: {e}']
+
+class _StatementRecord:
+    __slots__ = ('sql', 'calls', 'total_ms', 'max_ms', 'rows', 'requests', 'last_request')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.requests = 0
+        self.last_request = None
+
+def _record(connection, sql, params, elapsed_ms, explain=True):
+    key = normalize_sql(sql)
+    request_id = current_request_id()
+    with _lock:
+        record = _stats.get(key)
+        if record is None:
+            if len(_stats) >= MAX_STATEMENTS:
+                return key
+            record = _stats[key] = _StatementRecord(key)
+        record.calls += 1
+        record.total_ms += elapsed_ms
+        record.max_ms = max(record.max_ms, elapsed_ms)
+        if request_id is not None and request_id != record.last_request:
+            record.requests += 1
+            record.last_request = request_id
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        plan = _explain(connection, sql, params) if explain else ['not explained (executemany)']
+        _slow_queries.append({
+            'sql': key,
+            'ms': round(elapsed_ms, 2),
+            'plan': plan,
+            'at': datetime.now().isoformat(timespec='seconds')
+        })
+        logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {key} | plan: {'; '.join(plan)}")
+    return key
+
+def _count_rows(key, rows):
+    with _lock:
+        record = _stats.get(key)
+        if record is not None:
+            record.rows += rows
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times each statement and counts the rows fetched from it"""
+
+    _profile_key = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._profile_key = _record(self.connection, sql, parameters, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # A batch has no single parameter set to explain the plan with
+            self._profile_key = _record(self.connection, sql, None, (time.perf_counter() - started) * 1000,
+                                        explain=False)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self._profile_key:
+            _count_rows(self._profile_key, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        if self._profile_key:
+            _count_rows(self._profile_key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self._profile_key:
+            _count_rows(self._profile_key, len(rows))
+        return rows
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose cursors (including Connection.execute) are profiled"""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def top_statements(limit=20, order_by='total_ms'):
+    """Profiled statements sorted by total (or max/avg) time, highest first"""
+    with _lock:
+        records = list(_stats.values())
+    statements = [{
+        'sql': record.sql,
+        'calls': record.calls,
+        'total_ms': round(record.total_ms, 2),
+        'avg_ms': round(record.total_ms / record.calls, 3) if record.calls else 0.0,
+        'max_ms': round(record.max_ms, 2),
+        'rows': record.rows,
+        'calls_per_request': round(record.calls / record.requests, 2) if record.requests else None
+    } for record in records]
+    if order_by not in ('total_ms', 'avg_ms', 'max_ms', 'calls', 'rows'):
+        order_by = 'total_ms'
+    statements.sort(key=lambda statement: statement[order_by], reverse=True)
+    return statements[:limit]
+
+def slow_queries(limit=50):
+    """Most recent slow queries with their plans, newest first"""
+    return list(_slow_queries)[::-1][:limit]
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database.py opens vbspu_bot.db in the working directory on import; keep the live one untouched
+os.chdir(tempfile.mkdtemp(prefix='vbspu-tests-'))
+
+import response_templates
+from database import DatabaseManager
+
+@pytest.fixture
+def db(tmp_path):
+    """DatabaseManager on a throwaway database, with the shared snapshots reset"""
+    for snapshot in (DatabaseManager._quick_info, DatabaseManager._scraped_snapshot,
+                     DatabaseManager._settings_snapshot, response_templates._compiled):
+        snapshot.update(version=None, data=None)
+    DatabaseManager._versions.update(values=None, checked_at=0.0)
+    DatabaseManager._mapping_hits.update(counts={}, total=0, flushed_at=0.0)
+    return DatabaseManager(str(tmp_path / 'test.db'))
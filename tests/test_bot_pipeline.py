@@ -0,0 +1,17 @@
+from bot_pipeline import ChatPipeline, classify
+
+def test_admit_card_is_an_exam_question():
+    assert classify('b.ed admit card') == 'exam'
+    assert classify('hall ticket kab milega') == 'exam'
+    assert classify('admission kab hoga') == 'admission'
+
+def test_admit_card_answer_links_matching_exam_items(db):
+    db.save_scraped_data('examinations', {
+        'admit_cards': [{'title': 'B.Ed Admit Card 2025', 'url': 'https://vbspu.ac.in/bed-admit-card'}],
+        'results': [{'title': 'M.A. Result 2025', 'url': 'https://vbspu.ac.in/ma-result'}]
+    })
+
+    response = ChatPipeline(db).generate_response('B.Ed admit card')
+
+    assert 'https://vbspu.ac.in/bed-admit-card' in response
+    assert 'https://vbspu.ac.in/ma-result' not in response
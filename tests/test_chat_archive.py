@@ -0,0 +1,47 @@
+import sqlite3
+
+def add_chat(db, timestamp, message):
+    conn = sqlite3.connect(db.db_name)
+    conn.execute('''
+        INSERT INTO chat_history (session_id, user_message, bot_response, timestamp)
+        VALUES (?, ?, ?, ?)
+    ''', ('s1', message, 'answer', timestamp))
+    conn.commit()
+    conn.close()
+
+def test_end_only_range_reads_archived_months(db):
+    add_chat(db, '2025-01-10 09:00:00', 'january')
+    add_chat(db, '2025-02-20 09:00:00', 'february')
+    add_chat(db, '2025-03-05 09:00:00', 'march')
+    assert db.archive_chat_history(hot_months=1) == 3
+
+    rows = list(db.iter_chat_history(end='2025-02-28'))
+    assert [row['user_message'] for row in rows] == ['january', 'february']
+
+    page, _ = db.get_chat_history_page(end='2025-02-28')
+    assert [row['user_message'] for row in page] == ['february', 'january']
+
+def test_start_only_range_reads_archived_months(db):
+    add_chat(db, '2025-01-10 09:00:00', 'january')
+    add_chat(db, '2025-02-20 09:00:00', 'february')
+    db.archive_chat_history(hot_months=1)
+
+    rows = list(db.iter_chat_history(start='2025-02-01'))
+    assert [row['user_message'] for row in rows] == ['february']
+
+def test_archiving_returns_freed_pages(db):
+    conn = sqlite3.connect(db.db_name)
+    conn.executemany('''
+        INSERT INTO chat_history (session_id, user_message, bot_response, timestamp)
+        VALUES (?, ?, ?, ?)
+    ''', [('s1', 'question ' * 50, 'answer ' * 200, '2025-01-10 09:00:00')] * 2000)
+    conn.commit()
+    pages_before = conn.execute('PRAGMA page_count').fetchone()[0]
+    conn.close()
+
+    assert db.archive_chat_history(hot_months=1) == 2000
+
+    conn = sqlite3.connect(db.db_name)
+    assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+    assert conn.execute('PRAGMA page_count').fetchone()[0] < pages_before / 2
+    conn.close()
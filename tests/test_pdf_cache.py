@@ -0,0 +1,38 @@
+import sqlite3
+import time
+
+import database
+
+def stored_hits(db):
+    conn = sqlite3.connect(db.db_name)
+    hits = conn.execute('SELECT SUM(hits) FROM query_pdf_mapping').fetchone()[0]
+    conn.close()
+    return hits
+
+def add_pdf(db, content):
+    pdf_id = db.save_pdf_upload('fees.pdf', 'fees.pdf', 'fees', '', '', 100, 1)
+    db.save_pdf_content(pdf_id, 1, content, '')
+    return pdf_id
+
+def test_miss_searches_the_normalized_query(db):
+    pdf_id = add_pdf(db, 'The B.Ed fee structure for 2025-26 session')
+
+    results = db.get_relevant_pdfs('  B.Ed   FEE structure?? ')
+
+    assert [row[0] for row in results] == [pdf_id]
+
+def test_cache_hits_are_written_in_batches(db, monkeypatch):
+    monkeypatch.setattr(database, 'QUERY_MAPPING_HIT_FLUSH_EVERY', 3)
+    monkeypatch.setattr(database, 'QUERY_MAPPING_HIT_FLUSH_INTERVAL', 3600)
+    db.get_relevant_pdfs('hostel fee')
+    db._mapping_hits['flushed_at'] = time.monotonic()
+
+    db.get_relevant_pdfs('hostel fee')
+    db.get_relevant_pdfs('hostel fee')
+    assert stored_hits(db) == 0
+
+    db.get_relevant_pdfs('hostel fee')
+    assert stored_hits(db) == 3
+
+    db.get_relevant_pdfs('hostel fee')
+    assert db.get_query_pdf_mappings()[0]['hits'] == 4
@@ -0,0 +1,35 @@
+import sqlite3
+
+def add_pdf(db, filename, content):
+    pdf_id = db.save_pdf_upload(filename, filename, 'general', '', '', 100, 1)
+    db.save_pdf_content(pdf_id, 1, content, '')
+    return pdf_id
+
+def mark_deleting(db, pdf_id):
+    conn = sqlite3.connect(db.db_name)
+    conn.execute("UPDATE pdf_uploads SET status = 'deleting' WHERE id = ?", (pdf_id,))
+    conn.commit()
+    conn.close()
+
+def test_interrupted_delete_is_finished_by_maintenance(db):
+    pdf_id = add_pdf(db, 'hostel.pdf', 'Hostel rules')
+    mark_deleting(db, pdf_id)
+
+    assert db.run_chat_maintenance()['pdfs_deleted'] == 1
+    assert db.get_pdf_by_id(pdf_id) is None
+    assert db.search_pdf_content('hostel') == []
+
+def test_finishing_a_delete_removes_the_stored_file(db, tmp_path):
+    pdf_id = add_pdf(db, 'hostel.pdf', 'Hostel rules')
+    stored = tmp_path / 'hostel.pdf'
+    stored.write_bytes(b'%PDF-1.4')
+    mark_deleting(db, pdf_id)
+
+    assert db.finish_pdf_deletions(str(tmp_path)) == 1
+    assert not stored.exists()
+
+def test_admin_search_skips_uploads_being_deleted(db):
+    kept = add_pdf(db, 'rules.pdf', 'Library rules')
+    mark_deleting(db, add_pdf(db, 'old.pdf', 'Old library rules'))
+
+    assert [row[0] for row in db.search_pdf_content('library')] == [kept]
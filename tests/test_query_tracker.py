@@ -0,0 +1,39 @@
+from query_tracker import QueryTracker
+
+def test_workers_add_to_shared_counts(db):
+    first, second = QueryTracker(db), QueryTracker(db)
+    for _ in range(3):
+        first.record('B.Ed fees')
+    second.record('b.ed fees')
+    second.record('hostel')
+    first.persist()
+    second.persist()
+
+    # A stale process persisting nothing new must not reset the counts
+    QueryTracker(db).persist()
+
+    top = first.top()
+    assert [(entry['query'], entry['count']) for entry in top] == [('b.ed fees', 4), ('hostel', 1)]
+    assert first.total() == 5
+
+def test_new_query_replaces_least_frequent_when_full(db):
+    tracker = QueryTracker(db, capacity=2)
+    tracker.record('fees')
+    tracker.record('fees')
+    tracker.record('hostel')
+    tracker.persist()
+    tracker.record('library')
+    tracker.persist()
+
+    top = {entry['query']: entry for entry in tracker.top()}
+    assert set(top) == {'fees', 'library'}
+    assert (top['library']['count'], top['library']['error']) == (2, 1)
+    assert tracker.total() == 4
+
+def test_prewarm_answers_top_queries(db):
+    tracker = QueryTracker(db)
+    tracker.record('hostel facility')
+    tracker.persist()
+
+    assert tracker.prewarm() == 1
+    assert db.get_query_pdf_mappings()
@@ -0,0 +1,71 @@
+import re
+
+# Words are split on anything that is not a letter, digit or '.', so that
+# course names like "b.sc" and "m.tech" survive as single tokens
+TOKEN_PATTERN = re.compile(r'[^\W_]+(?:\.[^\W_]+)*', re.UNICODE)
+
+# Common English/Hinglish filler words ignored when matching search terms
+STOPWORDS = {
+    'the', 'and', 'for', 'of', 'in', 'on', 'to', 'is', 'me', 'ka', 'ki', 'ke',
+    'kya', 'hai', 'hain', 'kab', 'kaise', 'kahan', 'se', 'ko', 'aur', 'bhi',
+    'please', 'batao', 'bataiye', 'what', 'when', 'where', 'how', 'my'
+}
+
+# Chunk geometry (in words) used when segmenting PDF pages
+CHUNK_SIZE = 20
+CHUNK_OVERLAP = 10
+
+def tokenize(text):
+    """Split text into lowercase tokens"""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+def normalize_text(text):
+    """Lowercase and collapse text into a single-space separated token string"""
+    return ' '.join(tokenize(text))
+
+def search_terms(text):
+    """Get the set of index terms for text.
+
+    Stopwords are dropped, dotted abbreviations are also indexed without
+    dots ("b.ed" -> "bed") and a trailing plural 's' is stripped, so that
+    "BCA results" and "B.C.A. Result" share terms.
+    """
+    terms = set()
+    for token in tokenize(text):
+        if token in STOPWORDS:
+            continue
+        variants = {token, token.replace('.', '')}
+        for variant in variants:
+            if len(variant) > 3 and variant.endswith('s') and not variant.endswith('ss'):
+                variant = variant[:-1]
+            if variant:
+                terms.add(variant)
+    return terms
+
+def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping word windows.
+
+    Returns a list of (start_offset, end_offset, chunk_text, normalized_tokens)
+    where the offsets are character positions in the original text.
+    """
+    if not text:
+        return []
+
+    words = [(m.start(), m.end()) for m in re.finditer(r'\S+', text)]
+    if not words:
+        return []
+
+    step = max(1, size - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        window = words[start:start + size]
+        start_offset = window[0][0]
+        end_offset = window[-1][1]
+        chunk = text[start_offset:end_offset]
+        chunks.append((start_offset, end_offset, ' '.join(chunk.split()), normalize_text(chunk)))
+        if start + size >= len(words):
+            break
+
+    return chunks
@@ -0,0 +1,12 @@
+"""Production WSGI entry point.
+
+Run under a pre-fork server with the app preloaded in the master process:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+"""
+from app import create_app, initialize_data, preload_read_only_data
+
+initialize_data()
+preload_read_only_data()
+
+application = create_app()